@@ -0,0 +1,375 @@
+import hashlib, json, os, sqlite3, threading, time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+from flask import current_app, has_app_context, make_response, request
+from flask_jwt_extended import current_user
+from sqlalchemy import event, inspect
+
+from App.database import db, replica_engine, use_primary
+from App.models import User
+
+# Roster and report reads vastly outnumber shift writes. Results are cached
+# under a "shift data version" that is bumped after every committed write to
+# the shift table (or to a user's name, which the roster shows next to each
+# shift), so a read between two writes never touches the database.
+# Each worker keeps an in-process LRU; the version counters (and a copy of
+# each payload) live in a shared local backend so all gunicorn workers on
+# the host agree on the current version.
+
+TABLE_SCOPES = {"shift": "shifts"}
+WILDCARD_SCOPE = "shifts:*"
+
+
+class MemoryBackend:
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl if ttl else None)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def add(self, key, value, ttl=None):
+        # set only if absent (or expired); returns whether it was stored
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[1] is None or entry[1] >= time.time()):
+                return False
+            self._entries[key] = (value, time.time() + ttl if ttl else None)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            value, expires = self._entries.get(key, (0, None))
+            self._entries[key] = (value + 1, expires)
+            return value + 1
+
+    def incr_stamped(self, key, stamp_key, stamp):
+        # incr(key) and raise stamp_key to at least stamp, as one step
+        with self._lock:
+            value, expires = self._entries.get(key, (0, None))
+            self._entries[key] = (value + 1, expires)
+            previous, _ = self._entries.get(stamp_key, (0, None))
+            self._entries[stamp_key] = (max(previous, stamp), None)
+            return value + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteBackend:
+    """Key/value store in a local SQLite file, shared by every process on the host."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        # one connection per thread/greenlet, reopened after a fork
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL)"
+            )
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, key):
+        row = self._connection().execute("SELECT value, expires FROM kv WHERE key = ?", (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return None
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO kv (key, value, expires) VALUES (?, ?, ?)",
+            (key, json.dumps(value), time.time() + ttl if ttl else None)
+        )
+
+    def add(self, key, value, ttl=None):
+        connection = self._connection()
+        connection.execute("DELETE FROM kv WHERE key = ? AND expires IS NOT NULL AND expires < ?", (key, time.time()))
+        cursor = connection.execute(
+            "INSERT OR IGNORE INTO kv (key, value, expires) VALUES (?, ?, ?)",
+            (key, json.dumps(value), time.time() + ttl if ttl else None)
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key):
+        self._connection().execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def incr(self, key):
+        return self.incr_stamped(key, None, None)
+
+    def incr_stamped(self, key, stamp_key, stamp):
+        # incr(key) and raise stamp_key to at least stamp, in one transaction
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+            value = (json.loads(row[0]) if row else 0) + 1
+            connection.execute("INSERT OR REPLACE INTO kv (key, value, expires) VALUES (?, ?, NULL)", (key, json.dumps(value)))
+            if stamp_key is not None:
+                row = connection.execute("SELECT value FROM kv WHERE key = ?", (stamp_key,)).fetchone()
+                previous = json.loads(row[0]) if row else 0
+                connection.execute("INSERT OR REPLACE INTO kv (key, value, expires) VALUES (?, ?, NULL)",
+                                   (stamp_key, json.dumps(max(previous, stamp))))
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return value
+
+    def purge_expired(self):
+        self._connection().execute("DELETE FROM kv WHERE expires IS NOT NULL AND expires < ?", (time.time(),))
+
+    def clear(self):
+        self._connection().execute("DELETE FROM kv")
+
+
+class DataCache:
+    def __init__(self, shared=None, size=64, ttl=300, enabled=True, namespace=""):
+        # namespace tells apart databases that share one backend file
+        self.namespace = namespace
+        self.local = MemoryBackend(size)
+        self.shared = shared
+        self.versions = shared if shared is not None else MemoryBackend()
+        self.ttl = ttl
+        self.enabled = enabled
+
+    def version(self, scope="shifts"):
+        return self.versions.get(f"{self.namespace}version:{scope}") or 0
+
+    def bump(self, scope="shifts"):
+        # the real commit time, kept to the sub-second: a Last-Modified header
+        # rounds it down, so a later write in the same second still fails
+        # If-Modified-Since (the ETag tells such writes apart for 304s)
+        return self.versions.incr_stamped(f"{self.namespace}version:{scope}", f"{self.namespace}modified:{scope}", time.time())
+
+    def validators(self, scope="shifts"):
+        # (versions, last modified timestamp) for a scope; scoped counters are
+        # paired with the wildcard bumped by bulk writes
+        scopes = [scope] if scope in TABLE_SCOPES.values() else [scope, WILDCARD_SCOPE]
+        versions = [self.version(name) for name in scopes]
+        modified = max(self.versions.get(f"{self.namespace}modified:{name}") or 0 for name in scopes)
+        return versions, modified or None
+
+    def _recently_modified(self, scope):
+        lag = current_app.config.get("REPLICA_MAX_LAG_SECONDS", 5) if has_app_context() else 5
+        _, modified = self.validators(scope)
+        return modified is not None and time.time() - modified < lag
+
+    def get_or_set(self, name, producer, scope="shifts"):
+        if not self.enabled:
+            return producer()
+
+        # read the version before producing, so a write that lands mid-query
+        # leaves the result under the old (already superseded) key
+        key = f"{self.namespace}{name}:{scope}:{self.version(scope)}"
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        if self.shared is not None:
+            value = self.shared.get(key)
+            if value is not None:
+                self.local.set(key, value)
+                return value
+
+        value = producer()
+        if replica_engine() is not None and self._recently_modified(scope):
+            # a replica may not have this version's write yet; do not cache
+            # what it returned under the new version
+            return value
+        self.local.set(key, value)
+        if self.shared is not None:
+            self.shared.set(key, value, self.ttl)
+        return value
+
+
+def init_cache(app):
+    shared = None
+    if app.config.get("CACHE_BACKEND") == "sqlite":
+        path = app.config.get("CACHE_BACKEND_PATH") or os.path.join(app.instance_path, "cache.sqlite3")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        shared = SQLiteBackend(path)
+        shared.purge_expired()
+    app.extensions["data_cache"] = DataCache(
+        shared,
+        app.config.get("RESPONSE_CACHE_SIZE", 64),
+        app.config.get("RESPONSE_CACHE_TTL", 300),
+        app.config.get("RESPONSE_CACHE_ENABLED", True),
+        database_namespace(app)
+    )
+    _register_listeners()
+
+
+def database_namespace(app):
+    # the resolved URL (relative SQLite paths end up under the instance
+    # folder), hashed so no credentials land in the backend file
+    with app.app_context():
+        url = db.engine.url.render_as_string(hide_password=False)
+    return hashlib.sha1(url.encode()).hexdigest()[:12] + ":"
+
+
+def get_cache():
+    return current_app.extensions["data_cache"]
+
+
+def cached(name, producer, scope="shifts"):
+    return get_cache().get_or_set(name, producer, scope)
+
+
+def get_data_version(scope="shifts"):
+    return get_cache().version(scope)
+
+
+def bump_data_version(scope="shifts"):
+    if has_app_context() and "data_cache" in current_app.extensions:
+        return get_cache().bump(scope)
+    return None
+
+
+def _shift_scopes(shift):
+    # the global roster plus the schedule and staff member the shift belongs
+    # to, before and after this change (a reassignment touches both staff)
+    scopes = {"shifts"}
+    state = inspect(shift)
+    for column, prefix in (("staff_id", "staff"), ("schedule_id", "schedule")):
+        history = state.attrs[column].history
+        for value in list(history.added) + list(history.unchanged) + list(history.deleted):
+            if value is not None:
+                scopes.add(f"{prefix}:{value}")
+    return scopes
+
+
+def _user_shown_differently(session, user):
+    # cached rosters and reports carry staff names; logins and password
+    # changes leave them as they were
+    return user in session.deleted or inspect(user).attrs["username"].history.has_changes()
+
+
+def _after_flush(session, flush_context):
+    scopes = session.info.setdefault("written_scopes", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if getattr(obj, "__tablename__", None) == "shift":
+            scopes.update(_shift_scopes(obj))
+        elif isinstance(obj, User) and obj not in session.new and _user_shown_differently(session, obj):
+            # any scope may show this user's name
+            scopes.update(("shifts", WILDCARD_SCOPE))
+
+
+def _after_commit(session):
+    scopes = session.info.pop("written_scopes", set())
+    for table in session.info.pop("written_tables", ()):
+        # bulk writes do not say which staff or schedules they touched, so
+        # they bump the wildcard scope every scoped validator also checks
+        if table in TABLE_SCOPES:
+            scopes.update((TABLE_SCOPES[table], WILDCARD_SCOPE))
+    for scope in scopes:
+        bump_data_version(scope)
+
+
+def _after_rollback(session):
+    session.info.pop("written_tables", None)
+    session.info.pop("written_scopes", None)
+
+
+def _after_create(target, connection, **kw):
+    # the schema was (re)created, so anything cached describes data that is gone
+    for scope in set(TABLE_SCOPES.values()) | {WILDCARD_SCOPE}:
+        bump_data_version(scope)
+
+
+_listeners_registered = False
+
+def _register_listeners():
+    global _listeners_registered
+    if _listeners_registered:
+        return
+    event.listen(db.session, "after_flush", _after_flush)
+    event.listen(db.session, "after_commit", _after_commit)
+    event.listen(db.session, "after_rollback", _after_rollback)
+    event.listen(db.metadata, "after_create", _after_create)
+    _listeners_registered = True
+
+
+def _etag_for(scope, versions):
+    tag = f"{scope}-" + "-".join(str(version) for version in versions)
+    # the same scope can be rendered in several formats
+    variant = request.query_string + b"|" + request.headers.get("Accept", "").encode()
+    if variant != b"|":
+        tag += "-" + hashlib.sha1(variant).hexdigest()[:12]
+    return tag
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        # If-None-Match wins over If-Modified-Since when both are sent
+        return request.if_none_match.contains(etag)
+    if request.if_modified_since and last_modified is not None:
+        return last_modified <= request.if_modified_since.timestamp()
+    return False
+
+
+def conditional(scope_for_request, roles=None):
+    """Adds ETag/Last-Modified to a GET view and answers matching conditional
+    requests with 304 from the scope's change counters, without calling the view."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if roles is not None and getattr(current_user, "role", None) not in roles:
+                return view(*args, **kwargs)
+
+            scope = scope_for_request(*args, **kwargs)
+            cache = get_cache()
+            versions, modified = cache.validators(scope)
+            if replica_engine() is not None and cache._recently_modified(scope):
+                # these validators name a write a replica may not have yet;
+                # build the body on the primary so it matches them
+                use_primary()
+            etag = _etag_for(scope, versions)
+            last_modified = datetime.fromtimestamp(modified, timezone.utc) if modified else None
+
+            if _not_modified(etag, modified):
+                response = make_response("", 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.headers["Cache-Control"] = "private, no-cache"
+            response.vary.add("Accept")
+            return response
+        return wrapper
+    return decorator
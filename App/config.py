@@ -20,5 +20,55 @@ def load_config(app, overrides):
     app.config["JWT_COOKIE_SECURE"] = True
     app.config["JWT_COOKIE_CSRF_PROTECT"] = False
     app.config['FLASK_ADMIN_SWATCH'] = 'darkly'
+    app.config.setdefault('IDENTITY_CACHE_TTL', 0)
+    app.config.setdefault('IDENTITY_CACHE_SIZE', 1024)
+    app.config.setdefault('BULK_USERS_ALLOW_ADMIN', False)
+    app.config.setdefault('OFFLOAD_WORKERS', 0)
+    app.config.setdefault('OFFLOAD_TIMEOUT', 30)
+    app.config.setdefault('RESPONSE_CACHE_ENABLED', True)
+    app.config.setdefault('RESPONSE_CACHE_SIZE', 64)
+    app.config.setdefault('RESPONSE_CACHE_TTL', 300)
+    app.config.setdefault('CACHE_BACKEND', 'sqlite')
+    app.config.setdefault('CACHE_BACKEND_PATH', None)
+    app.config.setdefault('EVENTS_BROKER', 'sqlite')
+    app.config.setdefault('EVENTS_BROKER_PATH', None)
+    app.config.setdefault('EVENTS_POLL_INTERVAL', 0.5)
+    app.config.setdefault('EVENTS_HEARTBEAT', 15)
+    app.config.setdefault('IDEMPOTENCY_BACKEND', 'sqlite')
+    app.config.setdefault('IDEMPOTENCY_BACKEND_PATH', None)
+    app.config.setdefault('IDEMPOTENCY_TTL', 86400)
+    app.config.setdefault('PAYROLL_OVERTIME_HOURS', 40)
+    app.config.setdefault('PAYROLL_GRACE_MINUTES', 5)
+    app.config.setdefault('COVERAGE_MIN_STAFF', 1)
+    app.config.setdefault('DEMAND_SHIFT_LENGTHS', [4, 6, 8])
+    app.config.setdefault('DB_POOL_SIZE', 10)
+    app.config.setdefault('DB_MAX_OVERFLOW', 10)
+    app.config.setdefault('DB_POOL_TIMEOUT', 30)
+    app.config.setdefault('DB_POOL_RECYCLE', 1800)
+    app.config.setdefault('DB_POOL_PRE_PING', True)
+    app.config.setdefault('DB_STATEMENT_TIMEOUT_MS', 30000)
+    app.config.setdefault('SQLITE_PROFILE', True)
+    app.config.setdefault('SQLITE_BUSY_TIMEOUT_MS', 5000)
+    app.config.setdefault('SQLITE_SYNCHRONOUS', 'NORMAL')
+    app.config.setdefault('SQLITE_MMAP_SIZE', 268435456)
+    app.config.setdefault('SQLITE_CACHE_SIZE', -64000)
+    app.config.setdefault('SQLITE_BUSY_RETRIES', 3)
+    app.config.setdefault('SQLALCHEMY_REPLICA_URIS', [])
+    app.config.setdefault('REPLICA_STICKY_SECONDS', 5)
+    app.config.setdefault('REPLICA_MAX_LAG_SECONDS', 5)
+    app.config.setdefault('JSON_BACKEND', 'auto')
+    app.config.setdefault('METRICS_ENABLED', True)
+    app.config.setdefault('METRICS_DIR', '')
+    app.config.setdefault('METRICS_ALLOWED_ADDRESSES', ['127.0.0.1', '::1'])
+    app.config.setdefault('METRICS_FLUSH_INTERVAL', 1.0)
+    app.config.setdefault('SERVER_TIMING_ENABLED', True)
+    app.config.setdefault('PROFILING_ENABLED', False)
+    app.config.setdefault('PROFILE_DIR', None)
+    app.config.setdefault('PROFILE_ENDPOINTS', [])
+    app.config.setdefault('PROFILE_SAMPLE_RATE', 1.0)
+    app.config.setdefault('PROFILE_SLOW_MS', 500)
+    app.config.setdefault('PROFILE_GENERATIONS', True)
+    app.config.setdefault('PROFILE_KEEP', 50)
+    app.config.setdefault('PROFILE_MAX_STATEMENTS', 200)
     for key in overrides:
         app.config[key] = overrides[key]
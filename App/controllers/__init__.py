@@ -1,6 +1,14 @@
+from .identity import *
 from .user import *
 from .auth import *
 from .initialize import *
 from .admin import *
 from .staff import *    
 from .scheduler import *
+from .template import *
+from .export import *
+from .payroll import *
+from .attendance import *
+from .coverage import *
+from .demand import *
+from .seed import *
@@ -4,11 +4,15 @@
 #from App.controllers.user import get_user
 #all of the above were duplicated imports
 
-from App.models import Shift, Schedule
-from App.database import db
+import csv, json, time
+from sqlalchemy import select, func, cast, extract, Integer, BigInteger
+from App.models import Shift, Schedule, Staff, User, AttendanceSummary
+from App.database import db, bulk_insert, retry_on_busy
+from App.cache import cached
 from datetime import datetime
 from App.controllers.user import get_user
 
+@retry_on_busy
 def create_schedule(admin_id, week_start): #Not sure why this was missing
     admin = get_user(admin_id)
     if not admin or admin.role != "admin":
@@ -23,6 +27,7 @@ def create_schedule(admin_id, week_start): #Not sure why this was missing
 
     return new_schedule
 
+@retry_on_busy
 def create_unassigned_shift(start_time, end_time):
     new_shift = Shift(
         staff_id=None,
@@ -37,6 +42,7 @@ def create_unassigned_shift(start_time, end_time):
     return new_shift
 
 
+@retry_on_busy
 def schedule_shift(admin_id, staff_id, schedule_id, start_time, end_time):
     admin = get_user(admin_id)
     staff = get_user(staff_id)
@@ -63,9 +69,206 @@ def schedule_shift(admin_id, staff_id, schedule_id, start_time, end_time):
     return new_shift
 
 
-def get_shift_report(admin_id):
+def get_schedule(admin_id, schedule_id):
+    admin = get_user(admin_id)
+    if not admin or admin.role != "admin":
+        raise PermissionError("Only admins can view schedules")
+    schedule = db.session.get(Schedule, schedule_id)
+    if not schedule:
+        raise ValueError("Invalid schedule ID")
+    return schedule
+
+
+def get_shift_report(admin_id, layout="rows"):
     admin = get_user(admin_id)
     if not admin or admin.role != "admin":
         raise PermissionError("Only admins can view shift reports")
 
-    return [shift.get_json() for shift in Shift.query.order_by(Shift.start_time).all()]
\ No newline at end of file
+    return get_roster(layout)
+
+
+ROSTER_FIELDS = ("id", "staff_id", "staff_name", "start_time", "schedule_id", "end_time", "clock_in", "clock_out")
+
+
+def _roster_statement(*columns):
+    return (
+        select(*columns)
+        .outerjoin(User, User.id == Shift.staff_id)
+        .order_by(Shift.start_time, Shift.id)
+    )
+
+
+def get_roster_json():
+    # Same fields and values as Shift.get_json, read straight from the rows:
+    # no Shift objects and no per-row staff lookup. Times are written as ISO
+    # strings here, before the payload is cached, so every cache layer and
+    # caller sees the same types
+    statement = _roster_statement(Shift.id, Shift.staff_id, func.coalesce(User.username, "Unassigned"), Shift.start_time,
+                                  Shift.schedule_id, Shift.end_time, Shift.clock_in, Shift.clock_out)
+    return [
+        dict(zip(ROSTER_FIELDS, (shift_id, staff_id, staff_name, start_time.isoformat(), schedule_id, end_time.isoformat(),
+                                 clock_in.isoformat() if clock_in else None, clock_out.isoformat() if clock_out else None)))
+        for shift_id, staff_id, staff_name, start_time, schedule_id, end_time, clock_in, clock_out in db.session.execute(statement)
+    ]
+
+
+def _wall_seconds(column):
+    # whole seconds from 1970-01-01 00:00 to a stored (naive) time, counted by
+    # the database as if it were UTC, so the rows never become datetime objects
+    if db.engine.dialect.name == "sqlite":
+        return cast(func.strftime("%s", column), Integer)
+    return cast(func.floor(extract("epoch", column)), BigInteger)
+
+
+def _local_epochs(values):
+    # The columns hold server-local wall time (see _wall_seconds), so each
+    # value is moved by the UTC offset in force at that time to give a true
+    # Unix timestamp. Offsets only change on the hour, so one mktime per hour.
+    offsets = {}
+    epochs = []
+    for value in values:
+        if value is None:
+            epochs.append(None)
+            continue
+        hour = value - value % 3600
+        offset = offsets.get(hour)
+        if offset is None:
+            offset = offsets[hour] = int(time.mktime(time.gmtime(hour)[:8] + (-1,))) - hour
+        epochs.append(value + offset)
+    return epochs
+
+
+def get_roster_columns():
+    # The same roster as one array per field instead of one object per shift.
+    # Staff names repeat on every row, so they are written once in
+    # dictionary["staff_name"] and the column holds indexes into it; times are
+    # Unix timestamps (true UTC epochs of the server-local stored times, see
+    # _local_epochs), null if unset.
+    statement = _roster_statement(Shift.id, Shift.staff_id, func.coalesce(User.username, "Unassigned"),
+                                  _wall_seconds(Shift.start_time), Shift.schedule_id, _wall_seconds(Shift.end_time),
+                                  _wall_seconds(Shift.clock_in), _wall_seconds(Shift.clock_out))
+    rows = db.session.execute(statement).all()
+    columns = {field: list(values) for field, values in zip(ROSTER_FIELDS, zip(*rows))} or {field: [] for field in ROSTER_FIELDS}
+    for field in ("start_time", "end_time", "clock_in", "clock_out"):
+        columns[field] = _local_epochs(columns[field])
+    names = {}
+    columns["staff_name"] = [names.setdefault(name, len(names)) for name in columns["staff_name"]]
+    return {
+        "format": "columnar",
+        "count": len(rows),
+        "dictionary": {"staff_name": list(names)},
+        "columns": columns
+    }
+
+
+ROSTER_LAYOUTS = {
+    "rows": ("roster", get_roster_json),
+    "columnar": ("roster-columnar", get_roster_columns)
+}
+
+
+def get_roster(layout="rows"):
+    if layout not in ROSTER_LAYOUTS:
+        raise ValueError(f"format must be one of: {', '.join(ROSTER_LAYOUTS)}")
+    name, producer = ROSTER_LAYOUTS[layout]
+    return cached(name, producer)
+
+
+def _iter_shift_records(lines, file_format):
+    if file_format == "ndjson":
+        for line_number, line in enumerate(lines, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_number, json.loads(line), None
+            except ValueError:
+                yield line_number, None, "Invalid JSON"
+    else:
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, record, None
+
+
+def _parse_optional_id(value, known_ids, label):
+    if value in (None, ""):
+        return None, None
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None, f"Invalid {label}"
+    if value not in known_ids:
+        return None, f"Unknown {label} {value}"
+    return value, None
+
+
+def _validate_shift_record(record, staff_ids, schedule_ids):
+    if not isinstance(record, dict):
+        return None, "Record must be an object"
+    try:
+        start_time = datetime.fromisoformat(str(record.get("start_time") or "").strip())
+        end_time = datetime.fromisoformat(str(record.get("end_time") or "").strip())
+    except ValueError:
+        return None, "start_time and end_time must be ISO datetimes"
+    if end_time <= start_time:
+        return None, "end_time must be after start_time"
+
+    staff_id, error = _parse_optional_id(record.get("staff_id"), staff_ids, "staff_id")
+    if error:
+        return None, error
+    schedule_id, error = _parse_optional_id(record.get("schedule_id"), schedule_ids, "schedule_id")
+    if error:
+        return None, error
+
+    return {
+        "staff_id": staff_id,
+        "schedule_id": schedule_id,
+        "start_time": start_time,
+        "end_time": end_time
+    }, None
+
+
+def _insert_shift_batch(batch):
+    # bulk inserts bypass the ORM flush, so the attendance rows are updated here
+    inserted = bulk_insert(Shift.__table__, batch)
+    AttendanceSummary.apply_rows(db.session.connection(), batch)
+    return inserted
+
+
+def import_shifts(admin_id, lines, file_format="csv", batch_size=1000):
+    admin = get_user(admin_id)
+    if not admin or admin.role != "admin":
+        raise PermissionError("Only admins can import shifts")
+    if file_format not in ("csv", "ndjson"):
+        raise ValueError(f"Unsupported import format: {file_format}")
+
+    staff_ids = set(db.session.scalars(select(Staff.id)))
+    schedule_ids = set(db.session.scalars(select(Schedule.id)))
+
+    # Rows are inserted in batches as the file streams in, all inside one
+    # transaction. If any line is bad the transaction is rolled back, so the
+    # file is validated in a single pass without being held in memory.
+    errors = []
+    batch = []
+    imported = 0
+    for line_number, record, error in _iter_shift_records(lines, file_format):
+        row = None
+        if error is None:
+            row, error = _validate_shift_record(record, staff_ids, schedule_ids)
+        if error:
+            errors.append({"line": line_number, "error": error})
+            continue
+        if errors:
+            continue
+        batch.append(row)
+        if len(batch) >= batch_size:
+            imported += _insert_shift_batch(batch)
+            batch = []
+
+    if errors:
+        db.session.rollback()
+        return {"imported": 0, "errors": errors}
+
+    imported += _insert_shift_batch(batch)
+    db.session.commit()
+    return {"imported": imported, "errors": []}
@@ -0,0 +1,38 @@
+from datetime import date, datetime, timedelta
+from sqlalchemy import select
+from App.models import AttendanceSummary, User
+from App.database import db
+from App.controllers.user import get_user
+
+
+def _week_of(value):
+    if value is None:
+        value = date.today()
+    elif not isinstance(value, date):
+        try:
+            value = datetime.strptime(value, "%Y-%m-%d").date()
+        except (TypeError, ValueError):
+            raise ValueError("week must be given as YYYY-MM-DD")
+    return value - timedelta(days=value.weekday())
+
+
+def get_attendance_summary(admin_id, week=None):
+    admin = get_user(admin_id)
+    if not admin or admin.role != "admin":
+        raise PermissionError("Only admins can view attendance")
+
+    week_start = _week_of(week)
+    rows = db.session.execute(
+        select(AttendanceSummary, User.username)
+        .join(User, User.id == AttendanceSummary.staff_id)
+        .where(AttendanceSummary.week_start == week_start)
+        .order_by(User.username)
+    ).all()
+    return {
+        "week_start": week_start.isoformat(),
+        "staff": [{**summary.get_json(), "staff_name": username} for summary, username in rows]
+    }
+
+
+def rebuild_attendance():
+    return AttendanceSummary.rebuild()
@@ -1,21 +1,20 @@
 from flask_jwt_extended import (
-    create_access_token, jwt_required, JWTManager,
-    get_jwt_identity, verify_jwt_in_request
+    create_access_token, JWTManager,
+    get_current_user, verify_jwt_in_request
 )
-from App.models import User
 from App.database import db
+from App.controllers.identity import load_user, invalidate_user
+from App.queries import user_by_username
 
 def login(username, password):
-  result = db.session.execute(db.select(User).filter_by(username=username))
-  user = result.scalar_one_or_none()
+  user = user_by_username(username)
   if user and user.check_password(password):
     # Store ONLY the user id as a string in JWT 'sub'
     return create_access_token(identity=str(user.id))
   return None
 
 def loginCLI(username, password):
-    result = db.session.execute(db.select(User).filter_by(username=username))
-    user = result.scalar_one_or_none()
+    user = user_by_username(username)
 
     if user and user.check_password(password):
         
@@ -25,13 +24,13 @@ def loginCLI(username, password):
         token = create_access_token(identity=str(user.id))
         user.active_token = token
         db.session.commit()
+        invalidate_user(user.id)
         return {"message": "Login successful", "token": token}
 
     return {"message": "Invalid username or password"}
 
 def logout(username):
-    result = db.session.execute(db.select(User).filter_by(username=username))
-    user = result.scalar_one_or_none()
+    user = user_by_username(username)
 
     if not user:
         return {"message": "User not found"}
@@ -41,6 +40,7 @@ def logout(username):
 
     user.active_token = None
     db.session.commit()
+    invalidate_user(user.id)
     return {"message": f"User {username} logged out successfully"}
 
 def setup_jwt(app):
@@ -54,12 +54,7 @@ def setup_jwt(app):
 
     @jwt.user_lookup_loader
     def user_lookup_callback(_jwt_header, jwt_data):
-        identity = jwt_data["sub"]
-        try:
-            user_id = int(identity)
-        except (TypeError, ValueError):
-            return None
-        return db.session.get(User, user_id)
+        return load_user(jwt_data["sub"], jwt_data.get("jti"))
 
     return jwt
 
@@ -68,10 +63,11 @@ def add_auth_context(app):
     @app.context_processor
     def inject_user():
         try:
-            verify_jwt_in_request()
-            identity = get_jwt_identity()
-            user_id = int(identity) if identity is not None else None
-            current_user = db.session.get(User, user_id) if user_id is not None else None
+            # verified every time: the token state kept in flask.g belongs to the
+            # app context, which outlives a request; the user lookup itself is
+            # shared with jwt_required() through load_user
+            verify_jwt_in_request(optional=True)
+            current_user = get_current_user()
             is_authenticated = current_user is not None
         except Exception as e:
             print(e)
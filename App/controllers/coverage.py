@@ -0,0 +1,114 @@
+from datetime import date, datetime, timedelta
+from flask import current_app
+from sqlalchemy import select
+from App.models import Shift
+from App.database import db
+from App.controllers.user import get_user
+
+# Under-staffing check: a sweep over the sorted start and end times of the
+# assigned shifts in a range. Only the two time columns are loaded, each is
+# sorted once (O(n log n)) and merged in a single pass, yielding the number of
+# concurrent shifts for every interval between consecutive events.
+
+
+def _naive(moment):
+    # shift times are stored naive in server local time
+    return moment.astimezone().replace(tzinfo=None) if moment.tzinfo is not None else moment
+
+
+def _parse_moment(value, end_of_day=False):
+    if isinstance(value, datetime):
+        return _naive(value)
+    if isinstance(value, date):
+        moment = datetime.combine(value, datetime.min.time())
+    else:
+        try:
+            moment = datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise ValueError("start and end must be ISO dates or datetimes")
+        if len(value) > 10:
+            return _naive(moment)
+    # a bare end date includes the whole day
+    return moment + timedelta(days=1) if end_of_day else moment
+
+
+def coverage_levels(starts, ends, range_start, range_end):
+    """Yields (interval start, interval end, concurrent shifts) across the range."""
+    starts = sorted(max(start, range_start) for start in starts)
+    ends = sorted(min(end, range_end) for end in ends)
+    current, level = range_start, 0
+    i = j = 0
+    while current < range_end:
+        # shifts cover [start, end): an end at t is applied before a start at t
+        while j < len(ends) and ends[j] <= current:
+            level -= 1
+            j += 1
+        while i < len(starts) and starts[i] <= current:
+            level += 1
+            i += 1
+        following = min(
+            starts[i] if i < len(starts) else range_end,
+            ends[j] if j < len(ends) else range_end,
+            range_end
+        )
+        yield current, following, level
+        current = following
+
+
+def analyze_coverage(starts, ends, range_start, range_end, min_staff=1):
+    gaps = []
+    peak = None
+    for interval_start, interval_end, level in coverage_levels(starts, ends, range_start, range_end):
+        if peak is None or level > peak["staff"]:
+            peak = {"staff": level, "start": interval_start, "end": interval_end}
+        elif level == peak["staff"] and peak["end"] == interval_start:
+            peak["end"] = interval_end
+        if level < min_staff:
+            if gaps and gaps[-1]["end"] == interval_start and gaps[-1]["staff"] == level:
+                gaps[-1]["end"] = interval_end
+            else:
+                gaps.append({"start": interval_start, "end": interval_end, "staff": level})
+
+    return {
+        "start": range_start.isoformat(),
+        "end": range_end.isoformat(),
+        "min_staff": min_staff,
+        "shifts": len(starts),
+        "peak_staff": peak["staff"] if peak else 0,
+        "peak_start": peak["start"].isoformat() if peak else None,
+        "peak_end": peak["end"].isoformat() if peak else None,
+        "under_covered_hours": round(sum((gap["end"] - gap["start"]).total_seconds() for gap in gaps) / 3600, 2),
+        "gaps": [
+            {"start": gap["start"].isoformat(), "end": gap["end"].isoformat(), "staff": gap["staff"]}
+            for gap in gaps
+        ]
+    }
+
+
+def compute_coverage(range_start, range_end, min_staff=None):
+    if min_staff is None:
+        min_staff = current_app.config.get("COVERAGE_MIN_STAFF", 1)
+    if range_end <= range_start:
+        raise ValueError("end must be after start")
+
+    rows = db.session.execute(
+        select(Shift.start_time, Shift.end_time)
+        .where(Shift.staff_id.is_not(None))
+        .where(Shift.start_time < range_end, Shift.end_time > range_start)
+    ).all()
+    starts = [row[0] for row in rows]
+    ends = [row[1] for row in rows]
+    return analyze_coverage(starts, ends, range_start, range_end, min_staff)
+
+
+def week_coverage(week_start):
+    """Coverage of the seven days from week_start (a date, datetime or ISO string)."""
+    start = _parse_moment(week_start)
+    return compute_coverage(start, start + timedelta(days=7))
+
+
+def get_coverage(admin_id, start, end, min_staff=None):
+    admin = get_user(admin_id)
+    if not admin or admin.role != "admin":
+        raise PermissionError("Only admins can view coverage")
+    return compute_coverage(_parse_moment(start), _parse_moment(end, end_of_day=True), min_staff)
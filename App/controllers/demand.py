@@ -0,0 +1,126 @@
+import csv
+from datetime import date, datetime, timedelta
+from flask import current_app
+from App.models import Shift, ShiftTemplate
+from App.database import db, bulk_insert
+from App.controllers.user import get_user
+from App.controllers.scheduler import auto_generate_schedule, STRATEGIES
+
+# Turns an hourly staffing demand curve for a week into unassigned shifts.
+# The plan is a greedy sweep over the hours: at the first hour still short of
+# staff, start as many shifts as are missing, each of the longest allowed
+# length. Every shift that could cover that hour starts at or before it, and
+# nothing earlier is short, so the longest one covers the most of what comes
+# next; this gives the fewest shifts possible in O(hours) time.
+
+HOURS_PER_WEEK = 24 * 7
+
+
+def _parse_lengths(lengths):
+    if lengths is None:
+        lengths = current_app.config.get("DEMAND_SHIFT_LENGTHS", [4, 6, 8])
+    try:
+        lengths = sorted({int(length) for length in lengths})
+    except (TypeError, ValueError):
+        raise ValueError("Shift lengths must be whole hours")
+    if not lengths or lengths[0] < 1:
+        raise ValueError("Shift lengths must be at least one hour")
+    return lengths
+
+
+def _parse_demand(demand):
+    if not isinstance(demand, (list, tuple)) or not 0 < len(demand) <= HOURS_PER_WEEK:
+        raise ValueError(f"demand must list staff needed for up to {HOURS_PER_WEEK} hours")
+    try:
+        demand = [int(value) for value in demand]
+    except (TypeError, ValueError):
+        raise ValueError("demand values must be whole numbers")
+    if min(demand) < 0:
+        raise ValueError("demand values cannot be negative")
+    return demand
+
+
+def parse_demand_file(lines):
+    """Reads a CSV with "hour" (0 = Monday 00:00) and "staff" columns into a demand list."""
+    demand = [0] * HOURS_PER_WEEK
+    last_hour = -1
+    reader = csv.DictReader(lines)
+    for record in reader:
+        try:
+            hour = int(record["hour"])
+            staff = int(record["staff"])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Line {reader.line_num}: expected whole numbers in hour and staff columns")
+        if not 0 <= hour < HOURS_PER_WEEK:
+            raise ValueError(f"Line {reader.line_num}: hour must be between 0 and {HOURS_PER_WEEK - 1}")
+        demand[hour] = staff
+        last_hour = max(last_hour, hour)
+    if last_hour < 0:
+        raise ValueError("The demand file is empty")
+    return demand[:last_hour + 1]
+
+
+def plan_shifts(demand, lengths):
+    """Returns (start hour, length) pairs whose overlap meets demand at every hour."""
+    horizon = len(demand)
+    longest = lengths[-1]
+    # ending[h] = planned shifts that stop covering at hour h
+    ending = [0] * (horizon + longest + 1)
+    covered = 0
+    plan = []
+    for hour, needed in enumerate(demand):
+        covered -= ending[hour]
+        missing = needed - covered
+        if missing <= 0:
+            continue
+        # near the end of the curve, the shortest length reaching it is enough
+        length = next((length for length in lengths if hour + length >= horizon), longest)
+        plan.extend([(hour, length)] * missing)
+        ending[hour + length] += missing
+        covered += missing
+    return plan
+
+
+def generate_shifts_from_demand(admin_id, week_start, demand, lengths=None, strategy=None):
+    admin = get_user(admin_id)
+    if not admin or admin.role != "admin":
+        raise PermissionError("Only admins can generate shifts")
+
+    if not isinstance(week_start, date):
+        try:
+            week_start = datetime.strptime(week_start, "%Y-%m-%d").date()
+        except (TypeError, ValueError):
+            raise ValueError("week_start must be given as YYYY-MM-DD")
+    if strategy and strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy name: {strategy}")
+    first_hour = datetime.combine(ShiftTemplate.week_of(week_start), datetime.min.time())
+    demand = _parse_demand(demand)
+    plan = plan_shifts(demand, _parse_lengths(lengths))
+
+    rows = [{
+        "staff_id": None,
+        "schedule_id": None,
+        "start_time": first_hour + timedelta(hours=hour),
+        "end_time": first_hour + timedelta(hours=hour + length)
+    } for hour, length in plan]
+    created = bulk_insert(Shift.__table__, rows)
+
+    result = {
+        "week_start": first_hour.date().isoformat(),
+        "created": created,
+        "shift_hours": sum(length for _, length in plan),
+        "demand_hours": sum(demand)
+    }
+    if strategy and created:
+        # hand the new shifts straight to the schedule generator, which
+        # commits them with the schedule; if it fails, neither is kept
+        try:
+            schedule = auto_generate_schedule(strategy, first_hour.date())
+        except Exception:
+            db.session.rollback()
+            raise
+        result["schedule"] = schedule.get_json()
+        result["coverage"] = schedule.coverage
+    else:
+        db.session.commit()
+    return result
@@ -0,0 +1,108 @@
+import csv, io, json
+from datetime import datetime
+from sqlalchemy import select
+from App.models import Shift, User
+from App.database import db
+from App.controllers.user import get_user
+
+ROSTER_COLUMNS = ("id", "staff_id", "staff_name", "start_time", "schedule_id", "end_time", "clock_in", "clock_out")
+EXPORT_FORMATS = ("csv", "ndjson", "ics")
+
+
+def check_export_access(user_id, file_format, staff_id=None):
+    # Admins can export anything. Staff can export the combined roster (the same
+    # data get_combined_roster shows them) and only their own calendar.
+    # Returns the staff id the export should be limited to, if any.
+    user = get_user(user_id)
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {file_format}")
+    if not user or user.role not in ("admin", "staff"):
+        raise PermissionError("Only admins and staff can export the roster")
+    if user.role == "staff":
+        if staff_id is not None and int(staff_id) != user.id:
+            raise PermissionError("Staff can only export their own shifts")
+        if file_format == "ics":
+            return user.id
+    if file_format == "ics" and staff_id is None:
+        raise ValueError("staff_id is required for calendar exports")
+    return int(staff_id) if staff_id is not None else None
+
+
+def iter_roster_rows(staff_id=None, batch_size=1000):
+    statement = (
+        select(Shift.id, Shift.staff_id, User.username, Shift.start_time, Shift.schedule_id,
+               Shift.end_time, Shift.clock_in, Shift.clock_out)
+        .outerjoin(User, User.id == Shift.staff_id)
+        .order_by(Shift.start_time, Shift.id)
+        .execution_options(stream_results=True, yield_per=batch_size)
+    )
+    if staff_id is not None:
+        statement = statement.where(Shift.staff_id == staff_id)
+    # stream_results uses a server-side cursor where the driver has one, so
+    # only batch_size rows are held in memory at a time
+    for partition in db.session.execute(statement).partitions():
+        yield from partition
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def iter_csv(rows, batch_size=1000):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(ROSTER_COLUMNS)
+    yield buffer.getvalue()
+
+    count = 0
+    for shift_id, staff_id, username, start, schedule_id, end, clock_in, clock_out in rows:
+        if count == 0:
+            buffer.seek(0)
+            buffer.truncate()
+        writer.writerow((shift_id, staff_id, username or "Unassigned", _isoformat(start), schedule_id,
+                         _isoformat(end), _isoformat(clock_in), _isoformat(clock_out)))
+        count += 1
+        if count == batch_size:
+            yield buffer.getvalue()
+            count = 0
+    if count:
+        yield buffer.getvalue()
+
+
+def iter_ndjson(rows):
+    for shift_id, staff_id, username, start, schedule_id, end, clock_in, clock_out in rows:
+        yield json.dumps({
+            "id": shift_id,
+            "staff_id": staff_id,
+            "staff_name": username or "Unassigned",
+            "start_time": _isoformat(start),
+            "schedule_id": schedule_id,
+            "end_time": _isoformat(end),
+            "clock_in": _isoformat(clock_in),
+            "clock_out": _isoformat(clock_out)
+        }) + "\n"
+
+
+def _ics_time(value):
+    return value.strftime("%Y%m%dT%H%M%S")
+
+
+def iter_ics(rows, calendar_name="Roster"):
+    yield (
+        "BEGIN:VCALENDAR\r\n"
+        "VERSION:2.0\r\n"
+        "PRODID:-//GitItDone Rostering//Roster Export//EN\r\n"
+        f"X-WR-CALNAME:{calendar_name}\r\n"
+    )
+    stamp = _ics_time(datetime.now())
+    for shift_id, staff_id, username, start, schedule_id, end, clock_in, clock_out in rows:
+        yield (
+            "BEGIN:VEVENT\r\n"
+            f"UID:shift-{shift_id}@gititdone-rostering\r\n"
+            f"DTSTAMP:{stamp}\r\n"
+            f"DTSTART:{_ics_time(start)}\r\n"
+            f"DTEND:{_ics_time(end)}\r\n"
+            f"SUMMARY:Shift {shift_id}\r\n"
+            "END:VEVENT\r\n"
+        )
+    yield "END:VCALENDAR\r\n"
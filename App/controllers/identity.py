@@ -0,0 +1,136 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from flask import current_app, has_app_context, has_request_context, request
+from sqlalchemy import inspect
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm import make_transient_to_detached
+
+from App.database import db
+from App.queries import user_by_id
+
+# A protected request used to resolve the same user up to three times
+# (JWT user loader, template context processor, controller). Users looked up
+# while handling a request are kept in its WSGI environ so every path shares
+# one load (flask.g belongs to the app context, which can outlive a request).
+# Optionally, a small LRU keeps a column snapshot of recently seen users keyed
+# by (user id, token id) so the next request with the same token skips the
+# SELECT entirely. It is off unless IDENTITY_CACHE_TTL is greater than zero.
+
+
+class IdentityLRU:
+    def __init__(self, maxsize=1024, ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == user_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def setup_identity_cache(app):
+    ttl = app.config.get('IDENTITY_CACHE_TTL', 0)
+    if ttl and ttl > 0:
+        app.extensions['identity_cache'] = IdentityLRU(app.config.get('IDENTITY_CACHE_SIZE', 1024), ttl)
+    else:
+        app.extensions['identity_cache'] = None
+
+
+def _shared_cache():
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('identity_cache')
+
+
+def _request_cache():
+    if not has_request_context():
+        return None
+    return request.environ.setdefault('roster.identity_cache', {})
+
+
+def _normalize_id(user_id):
+    try:
+        return int(user_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def _snapshot(user):
+    mapper = inspect(user).mapper
+    return mapper.class_, {attr.key: getattr(user, attr.key) for attr in mapper.column_attrs}
+
+
+def _restore(snapshot):
+    cls, values = snapshot
+    # Rebuild a detached instance from the snapshot and merge it without a
+    # load, so the session gets a persistent User and no SQL is emitted.
+    user = inspect(cls).class_manager.new_instance()
+    for key, value in values.items():
+        set_committed_value(user, key, value)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+def load_user(user_id, token_id=None):
+    user_id = _normalize_id(user_id)
+    if user_id is None:
+        return None
+
+    request_cache = _request_cache()
+    if request_cache is not None and user_id in request_cache:
+        return request_cache[user_id]
+
+    user = None
+    shared = _shared_cache() if token_id else None
+    if shared is not None:
+        snapshot = shared.get((user_id, token_id))
+        if snapshot is not None:
+            user = _restore(snapshot)
+
+    if user is None:
+        user = user_by_id(user_id)
+        if user is not None and shared is not None:
+            shared.set((user_id, token_id), _snapshot(user))
+
+    if request_cache is not None:
+        request_cache[user_id] = user
+    return user
+
+
+def invalidate_user(user_id):
+    user_id = _normalize_id(user_id)
+    if user_id is None:
+        return
+    request_cache = _request_cache()
+    if request_cache is not None:
+        request_cache.pop(user_id, None)
+    shared = _shared_cache()
+    if shared is not None:
+        shared.invalidate(user_id)
@@ -0,0 +1,141 @@
+from datetime import date, datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, func, case, extract, literal, or_, and_
+from App.models import Shift, User
+from App.database import db
+from App.controllers.user import get_user
+from App.strategies.balancedaynight import NIGHT_START_HOUR, NIGHT_END_HOUR
+
+# Worked hours per staff member for a pay period, computed in one aggregate
+# query instead of looping over Shift objects:
+#   per shift  -> worked hours (clock_in..clock_out), night flag, minutes late
+#   per week   -> totals per staff member and week (overtime is weekly)
+#   per period -> regular/overtime split summed over the weeks
+# Night hours follow the same rule as get_shift_type: a shift is a night
+# shift when it is scheduled to start at or after NIGHT_START_HOUR or before
+# NIGHT_END_HOUR.
+
+
+def _hours_between(start, end):
+    if db.engine.dialect.name == "sqlite":
+        return (func.julianday(end) - func.julianday(start)) * 24.0
+    return extract("epoch", end - start) / 3600.0
+
+
+def _week_of(column):
+    if db.engine.dialect.name == "sqlite":
+        return func.date(column, "weekday 0", "-6 days")
+    return func.date_trunc("week", column)
+
+
+def _greatest(*values):
+    # SQLite's multi-argument max() is PostgreSQL's greatest()
+    return func.max(*values) if db.engine.dialect.name == "sqlite" else func.greatest(*values)
+
+
+def _least(*values):
+    return func.min(*values) if db.engine.dialect.name == "sqlite" else func.least(*values)
+
+
+def _parse_day(value):
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        raise ValueError("Dates must be given as YYYY-MM-DD")
+
+
+def payroll_query(period_start, period_end, overtime_hours=40, grace_minutes=5):
+    worked = _hours_between(Shift.clock_in, Shift.clock_out)
+    hour = extract("hour", Shift.start_time)
+    is_night = or_(hour >= NIGHT_START_HOUR, hour < NIGHT_END_HOUR)
+    minutes_late = _hours_between(Shift.start_time, Shift.clock_in) * 60.0
+    is_late = and_(Shift.clock_in.is_not(None), minutes_late > grace_minutes)
+    complete = and_(Shift.clock_in.is_not(None), Shift.clock_out.is_not(None))
+
+    per_shift = (
+        select(
+            Shift.staff_id.label("staff_id"),
+            _week_of(Shift.start_time).label("week"),
+            case((complete, worked), else_=0.0).label("worked"),
+            case((and_(complete, is_night), worked), else_=0.0).label("night"),
+            case((is_late, minutes_late), else_=0.0).label("late_minutes"),
+            case((is_late, 1), else_=0).label("late"),
+            case((complete, 0), else_=1).label("incomplete")
+        )
+        .where(Shift.staff_id.is_not(None))
+        .where(Shift.start_time >= period_start, Shift.start_time < period_end)
+        .subquery()
+    )
+
+    weekly = (
+        select(
+            per_shift.c.staff_id,
+            func.count().label("shifts"),
+            func.sum(per_shift.c.worked).label("worked"),
+            func.sum(per_shift.c.night).label("night"),
+            func.sum(per_shift.c.late_minutes).label("late_minutes"),
+            func.sum(per_shift.c.late).label("late"),
+            func.sum(per_shift.c.incomplete).label("incomplete")
+        )
+        .group_by(per_shift.c.staff_id, per_shift.c.week)
+        .subquery()
+    )
+
+    return (
+        select(
+            weekly.c.staff_id,
+            User.username,
+            func.sum(weekly.c.shifts).label("shifts"),
+            func.sum(weekly.c.worked).label("worked"),
+            func.sum(_least(weekly.c.worked, literal(float(overtime_hours)))).label("regular"),
+            func.sum(_greatest(weekly.c.worked - overtime_hours, literal(0.0))).label("overtime"),
+            func.sum(weekly.c.night).label("night"),
+            func.sum(weekly.c.late).label("late_shifts"),
+            func.sum(weekly.c.late_minutes).label("late_minutes"),
+            func.sum(weekly.c.incomplete).label("incomplete_shifts")
+        )
+        .join(User, User.id == weekly.c.staff_id)
+        .group_by(weekly.c.staff_id, User.username)
+        .order_by(User.username)
+    )
+
+
+def compute_payroll(admin_id, start, end, overtime_hours=None, grace_minutes=None):
+    admin = get_user(admin_id)
+    if not admin or admin.role != "admin":
+        raise PermissionError("Only admins can view payroll")
+
+    start, end = _parse_day(start), _parse_day(end)
+    if end < start:
+        raise ValueError("end must not be before start")
+    if overtime_hours is None:
+        overtime_hours = current_app.config.get("PAYROLL_OVERTIME_HOURS", 40)
+    if grace_minutes is None:
+        grace_minutes = current_app.config.get("PAYROLL_GRACE_MINUTES", 5)
+
+    # the period is inclusive of its end date
+    query = payroll_query(datetime.combine(start, datetime.min.time()),
+                          datetime.combine(end + timedelta(days=1), datetime.min.time()),
+                          float(overtime_hours), float(grace_minutes))
+    staff = [{
+        "staff_id": row.staff_id,
+        "staff_name": row.username,
+        "shifts": row.shifts,
+        "worked_hours": round(row.worked or 0, 2),
+        "regular_hours": round(row.regular or 0, 2),
+        "overtime_hours": round(row.overtime or 0, 2),
+        "night_hours": round(row.night or 0, 2),
+        "late_shifts": row.late_shifts or 0,
+        "late_minutes": round(row.late_minutes or 0, 1),
+        "incomplete_shifts": row.incomplete_shifts or 0
+    } for row in db.session.execute(query)]
+
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "overtime_threshold_hours": overtime_hours,
+        "grace_minutes": grace_minutes,
+        "staff": staff
+    }
@@ -1,4 +1,5 @@
 from App.models import Staff, Shift
+from App.metrics import timed_generation
 
 from App.strategies.schedule_generator import ScheduleGenerator
 from App.strategies.evendistribution import EvenDistributionStrategy
@@ -8,6 +9,13 @@ from App.strategies.minimizedays import MinimizeDaysStrategy
 
 
 
+STRATEGIES = {
+    "even": EvenDistributionStrategy,
+    "balance_day_night": BalanceDayNightStrategy,
+    "minimize_days": MinimizeDaysStrategy
+}
+
+
 def auto_generate_schedule(strategy_name="even", week_start=None):
     staff_list = Staff.query.all()
 
@@ -17,13 +25,9 @@ def auto_generate_schedule(strategy_name="even", week_start=None):
     generator = ScheduleGenerator()
     generator.setStaffList(staff_list)
 
-    if strategy_name == "even":
-        generator.setStrategy(EvenDistributionStrategy())
-    elif strategy_name == "balance_day_night":
-        generator.setStrategy(BalanceDayNightStrategy())
-    elif strategy_name == "minimize_days":
-        generator.setStrategy(MinimizeDaysStrategy())
-    else:
+    if strategy_name not in STRATEGIES:
         raise ValueError(f"Unknown strategy name: {strategy_name}")
+    generator.setStrategy(STRATEGIES[strategy_name]())
     
-    return generator.generateSchedule(week_start)
+    with timed_generation(strategy_name):
+        return generator.generateSchedule(week_start)
@@ -0,0 +1,122 @@
+import random, time
+from datetime import datetime, timedelta
+from sqlalchemy import insert, select
+from werkzeug.security import generate_password_hash
+from App.models import User, Staff, Shift, Schedule, AttendanceSummary
+from App.database import db, bulk_insert
+
+# Synthetic data for capacity testing. Every staff account shares one password
+# hash (hashing is deliberately slow, so it is done once), and users, shifts
+# and clock events go in with bulk inserts, one transaction per batch. The
+# weeks end with the current one; shifts that are over by now are clocked in
+# and out at clock_rate, a few minutes either side of their times.
+
+SHIFT_HOURS = 8
+CLOCK_IN_DRIFT = [timedelta(minutes=minutes) for minutes in range(-10, 16)]
+CLOCK_OUT_DRIFT = [timedelta(minutes=minutes) for minutes in range(-5, 21)]
+
+
+def _check_seed_options(staff, weeks, shifts_per_day, clock_rate, batch_size):
+    if staff < 1 or weeks < 1 or batch_size < 1:
+        raise ValueError("staff, weeks and batch size must be at least 1")
+    if not 1 <= shifts_per_day <= 24:
+        raise ValueError("shifts per day must be between 1 and 24")
+    if not 0 <= clock_rate <= 1:
+        raise ValueError("clock rate must be between 0 and 1")
+
+
+def _insert_staff(usernames, password_hash, batch_size):
+    existing = set()
+    for start in range(0, len(usernames), 500):
+        existing.update(db.session.scalars(select(User.username).where(User.username.in_(usernames[start:start + 500]))))
+    if existing:
+        raise ValueError(f"{len(existing)} username(s) already exist, e.g. {min(existing)}; use another prefix")
+
+    staff_ids = []
+    for start in range(0, len(usernames), batch_size):
+        values = [{"username": username, "password": password_hash, "role": "staff"} for username in usernames[start:start + batch_size]]
+        staff_ids.extend(db.session.scalars(insert(Staff).returning(Staff.id, sort_by_parameter_order=True), values))
+        db.session.commit()
+    return staff_ids
+
+
+def _week_schedules(week_starts):
+    # (week start, schedule id) for each week; a week that already has a
+    # schedule (from an earlier run or the app) keeps it, the rest are created
+    existing = {}
+    statement = select(Schedule.weekStart, Schedule.id).where(Schedule.weekStart.in_(week_starts)).order_by(Schedule.id)
+    for week_start, schedule_id in db.session.execute(statement):
+        existing.setdefault(week_start, schedule_id)
+    missing = [week_start for week_start in week_starts if week_start not in existing]
+    if missing:
+        created = db.session.scalars(insert(Schedule).returning(Schedule.id, sort_by_parameter_order=True),
+                                     [{"weekStart": week_start} for week_start in missing]).all()
+        existing.update(zip(missing, created))
+        db.session.commit()
+    return [(week_start, existing[week_start]) for week_start in week_starts]
+
+
+def _shift_rows(staff_ids, schedules, shifts_per_day, clock_rate, now, rng):
+    spacing = 24 // shifts_per_day
+    length = timedelta(hours=min(SHIFT_HOURS, spacing))
+    for week_start, schedule_id in schedules:
+        for day in range(7):
+            midnight = datetime.combine(week_start + timedelta(days=day), datetime.min.time())
+            for index, staff_id in enumerate(staff_ids):
+                # staggered so every hour of the day has someone on
+                offset = index % spacing
+                for number in range(shifts_per_day):
+                    start = midnight + timedelta(hours=offset + number * spacing)
+                    end = start + length
+                    clock_in = clock_out = None
+                    if end <= now and rng.random() < clock_rate:
+                        clock_in = start + rng.choice(CLOCK_IN_DRIFT)
+                        clock_out = end + rng.choice(CLOCK_OUT_DRIFT)
+                    yield {
+                        "staff_id": staff_id,
+                        "schedule_id": schedule_id,
+                        "start_time": start,
+                        "end_time": end,
+                        "clock_in": clock_in,
+                        "clock_out": clock_out
+                    }
+
+
+def seed_database(staff=100, weeks=4, shifts_per_day=1, clock_rate=0.9, password="staffpass", prefix="staff",
+                  batch_size=20000, random_seed=None):
+    _check_seed_options(staff, weeks, shifts_per_day, clock_rate, batch_size)
+    started = time.perf_counter()
+    rng = random.Random(random_seed)
+    now = datetime.now()
+
+    staff_ids = _insert_staff([f"{prefix}{number}" for number in range(1, staff + 1)], generate_password_hash(password), batch_size)
+
+    this_week = now.date() - timedelta(days=now.weekday())
+    week_starts = [this_week - timedelta(weeks=weeks - 1 - number) for number in range(weeks)]
+    schedules = _week_schedules(week_starts)
+
+    shifts = clocked = 0
+    batch = []
+    for row in _shift_rows(staff_ids, schedules, shifts_per_day, clock_rate, now, rng):
+        batch.append(row)
+        if len(batch) == batch_size:
+            shifts, clocked = _insert_shift_batch(batch, shifts, clocked)
+            batch = []
+    shifts, clocked = _insert_shift_batch(batch, shifts, clocked)
+
+    return {
+        "staff": len(staff_ids),
+        "schedules": len(schedules),
+        "shifts": shifts,
+        "clocked_shifts": clocked,
+        "seconds": round(time.perf_counter() - started, 2)
+    }
+
+
+def _insert_shift_batch(batch, shifts, clocked):
+    if batch:
+        # bulk inserts bypass the ORM flush, so the attendance rows are updated here
+        bulk_insert(Shift.__table__, batch)
+        AttendanceSummary.apply_rows(db.session.connection(), batch)
+        db.session.commit()
+    return shifts + len(batch), clocked + sum(1 for row in batch if row["clock_in"] is not None)
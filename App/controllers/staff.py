@@ -1,21 +1,24 @@
 from App.models import Shift
-from App.database import db
+from App.database import db, retry_on_busy
 from datetime import datetime
 from App.controllers.user import get_user
+from App.controllers.admin import get_roster
+from App.queries import shift_by_id
 
-def get_combined_roster(staff_id):
+def get_combined_roster(staff_id, layout="rows"):
     staff = get_user(staff_id)
     if not staff or staff.role != "staff":
         raise PermissionError("Only staff can view roster")
-    return [shift.get_json() for shift in Shift.query.order_by(Shift.start_time).all()]
+    return get_roster(layout)
 
 
+@retry_on_busy
 def clock_in(staff_id, shift_id):
     staff = get_user(staff_id)
     if not staff or staff.role != "staff":
         raise PermissionError("Only staff can clock in")
 
-    shift = db.session.get(Shift, shift_id)
+    shift = shift_by_id(shift_id)
 
     if not shift or shift.staff_id != staff_id:
         raise ValueError("Invalid shift for staff")
@@ -25,12 +28,13 @@ def clock_in(staff_id, shift_id):
     return shift
 
 
+@retry_on_busy
 def clock_out(staff_id, shift_id):
     staff = get_user(staff_id)
     if not staff or staff.role != "staff":
         raise PermissionError("Only staff can clock out")
 
-    shift = db.session.get(Shift, shift_id)
+    shift = shift_by_id(shift_id)
     if not shift or shift.staff_id != staff_id:
         raise ValueError("Invalid shift for staff")
 
@@ -39,5 +43,77 @@ def clock_out(staff_id, shift_id):
     return shift
 
 def get_shift(shift_id):
-    shift = db.session.get(Shift, shift_id)
-    return shift
\ No newline at end of file
+    shift = shift_by_id(shift_id)
+    return shift
+
+
+CLOCK_EVENT_KINDS = ("clock_in", "clock_out")
+PREFETCH_CHUNK = 500
+
+
+def _parse_clock_event(event, actor):
+    if not isinstance(event, dict):
+        raise ValueError("Event must be an object")
+    kind = event.get("kind")
+    if kind not in CLOCK_EVENT_KINDS:
+        raise ValueError("kind must be clock_in or clock_out")
+    try:
+        staff_id = int(event.get("staff_id", actor.id if actor.role == "staff" else None))
+        shift_id = int(event.get("shift_id"))
+    except (TypeError, ValueError):
+        raise ValueError("staff_id and shift_id must be integers")
+    if actor.role == "staff" and staff_id != actor.id:
+        raise PermissionError("Staff can only submit their own clock events")
+    try:
+        timestamp = datetime.fromisoformat(event.get("timestamp"))
+    except (TypeError, ValueError):
+        raise ValueError("timestamp must be an ISO datetime")
+    if timestamp.tzinfo is not None:
+        # punches are stored naive in server local time, like datetime.now()
+        timestamp = timestamp.astimezone().replace(tzinfo=None)
+    return staff_id, shift_id, kind, timestamp
+
+
+@retry_on_busy
+def apply_clock_events(actor_id, events):
+    actor = get_user(actor_id)
+    if not actor or actor.role not in ("staff", "admin"):
+        raise PermissionError("Only staff and admins can submit clock events")
+
+    results = [None] * len(events)
+    parsed = []
+    for index, event in enumerate(events):
+        try:
+            parsed.append((index, *_parse_clock_event(event, actor)))
+        except (PermissionError, ValueError) as e:
+            results[index] = {"index": index, "status": "error", "error": str(e)}
+
+    # one query per chunk of ids instead of a lookup per punch
+    shift_ids = sorted({shift_id for _, _, shift_id, _, _ in parsed})
+    shifts = {}
+    for start in range(0, len(shift_ids), PREFETCH_CHUNK):
+        chunk = shift_ids[start:start + PREFETCH_CHUNK]
+        shifts.update((shift.id, shift) for shift in Shift.query.filter(Shift.id.in_(chunk)))
+
+    # terminals replay buffered punches, so apply them in the order they happened
+    for index, staff_id, shift_id, kind, timestamp in sorted(parsed, key=lambda event: event[4]):
+        shift = shifts.get(shift_id)
+        result = {"index": index, "shift_id": shift_id, "kind": kind}
+        if not shift or shift.staff_id != staff_id:
+            result.update(status="error", error="Invalid shift for staff")
+        elif getattr(shift, kind) == timestamp:
+            result.update(status="duplicate")
+        elif getattr(shift, kind) is not None:
+            # a second, different punch is for a person to sort out
+            result.update(status="conflict", error=f"{kind} already recorded at {getattr(shift, kind).isoformat()}")
+        elif kind == "clock_out" and shift.clock_in and timestamp < shift.clock_in:
+            result.update(status="error", error="clock_out is before clock_in")
+        elif kind == "clock_in" and shift.clock_out and timestamp > shift.clock_out:
+            result.update(status="error", error="clock_in is after clock_out")
+        else:
+            setattr(shift, kind, timestamp)
+            result.update(status="applied")
+        results[index] = result
+
+    db.session.commit()
+    return results
@@ -0,0 +1,52 @@
+from datetime import datetime
+from App.models import ShiftTemplate
+from App.database import db
+from App.controllers.user import get_user
+
+MAX_EXPAND_WEEKS = 52
+
+
+def _require_admin(admin_id, message):
+    admin = get_user(admin_id)
+    if not admin or admin.role != "admin":
+        raise PermissionError(message)
+    return admin
+
+
+def _parse_time(value):
+    if hasattr(value, "hour"):
+        return value
+    try:
+        return datetime.strptime(value, "%H:%M").time()
+    except (TypeError, ValueError):
+        raise ValueError("Times must be given as HH:MM")
+
+
+def create_shift_template(admin_id, weekday, start_time, end_time, count=1, name=None):
+    _require_admin(admin_id, "Only admins can create shift templates")
+    try:
+        weekday = int(weekday)
+        count = int(count)
+    except (TypeError, ValueError):
+        raise ValueError("weekday and count must be integers")
+
+    template = ShiftTemplate(weekday, _parse_time(start_time), _parse_time(end_time), count, name)
+    db.session.add(template)
+    db.session.commit()
+    return template
+
+
+def get_shift_templates(admin_id):
+    _require_admin(admin_id, "Only admins can view shift templates")
+    return ShiftTemplate.query.order_by(ShiftTemplate.weekday, ShiftTemplate.start_time).all()
+
+
+def expand_shift_templates(admin_id, week_start, weeks=1):
+    _require_admin(admin_id, "Only admins can expand shift templates")
+    try:
+        weeks = int(weeks)
+    except (TypeError, ValueError):
+        raise ValueError("weeks must be an integer")
+    if not 1 <= weeks <= MAX_EXPAND_WEEKS:
+        raise ValueError(f"weeks must be between 1 and {MAX_EXPAND_WEEKS}")
+    return ShiftTemplate.expand(week_start, weeks)
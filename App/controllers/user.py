@@ -1,8 +1,16 @@
-from App.models import User, Admin, Staff, Shift
+import csv, json, os
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import generate_password_hash
+from App.models import User, Admin, Staff
 from App.database import db
-from datetime import datetime
+from App.controllers.identity import load_user, invalidate_user
+from App.queries import user_by_username
+from App.offload import run_many
 
 VALID_ROLES = {"user", "staff", "admin"}
+ROLE_MODELS = {"user": User, "staff": Staff, "admin": Admin}
+USERNAME_MAX_LENGTH = 20
 
 def create_user(username, password, role):
     role = role.lower().strip()
@@ -21,10 +29,10 @@ def create_user(username, password, role):
     return newuser
 
 def get_user_by_username(username):
-    return User.query.filter_by(username=username).first()
+    return user_by_username(username)
 
 def get_user(id):
-    return db.session.get(User, id)
+    return load_user(id)
 
 def get_all_users():
     return User.query.all()
@@ -40,5 +48,93 @@ def update_user(id, username):
     if user:
         user.username = username
         db.session.commit()
+        invalidate_user(id)
         return user
     return None
+
+
+def parse_user_file(path):
+    # .json files hold a list of {"username", "password", "role"} objects,
+    # anything else is read as CSV with a username,password,role header
+    with open(path, newline="") as f:
+        if os.path.splitext(path)[1].lower() == ".json":
+            data = json.load(f)
+            return data.get("users", []) if isinstance(data, dict) else data
+        return list(csv.DictReader(f))
+
+
+def _validate_user_rows(rows, errors, roles):
+    valid = []
+    seen = set()
+    for row_number, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append({"row": row_number, "error": "Row must be an object"})
+            continue
+        username = (row.get("username") or "").strip()
+        password = row.get("password") or ""
+        role = (row.get("role") or "staff").lower().strip()
+
+        if not username or not password:
+            errors.append({"row": row_number, "username": username, "error": "username and password are required"})
+        elif len(username) > USERNAME_MAX_LENGTH:
+            errors.append({"row": row_number, "username": username, "error": f"username longer than {USERNAME_MAX_LENGTH} characters"})
+        elif role not in VALID_ROLES:
+            errors.append({"row": row_number, "username": username, "error": f"Invalid role '{role}'"})
+        elif role not in roles:
+            errors.append({"row": row_number, "username": username, "error": f"Role '{role}' not allowed here"})
+        elif username in seen:
+            errors.append({"row": row_number, "username": username, "error": "Duplicate username in batch"})
+        else:
+            seen.add(username)
+            valid.append((row_number, username, password, role))
+    return valid
+
+
+def _insert_users(pending):
+    by_role = {}
+    for row_number, username, password_hash, role in pending:
+        by_role.setdefault(role, []).append({"username": username, "password": password_hash, "role": role})
+    for role, values in by_role.items():
+        db.session.execute(insert(ROLE_MODELS[role]), values)
+
+
+def bulk_create_users(rows, chunk_size=500, roles=VALID_ROLES):
+    errors = []
+    valid = _validate_user_rows(rows, errors, roles)
+    created = 0
+
+    for start in range(0, len(valid), chunk_size):
+        chunk = valid[start:start + chunk_size]
+
+        usernames = [username for _, username, _, _ in chunk]
+        existing = set(db.session.scalars(select(User.username).where(User.username.in_(usernames))))
+        for row_number, username, _, _ in chunk:
+            if username in existing:
+                errors.append({"row": row_number, "username": username, "error": "Username already exists"})
+        chunk = [row for row in chunk if row[1] not in existing]
+        if not chunk:
+            continue
+
+        hashes = run_many(generate_password_hash, [(password,) for _, _, password, _ in chunk])
+        pending = [(row_number, username, password_hash, role)
+                   for (row_number, username, _, role), password_hash in zip(chunk, hashes)]
+
+        try:
+            _insert_users(pending)
+            db.session.commit()
+            created += len(pending)
+        except IntegrityError:
+            # someone else took a username between the check and the insert;
+            # retry the chunk row by row so only the conflicting rows fail
+            db.session.rollback()
+            for row in pending:
+                try:
+                    with db.session.begin_nested():
+                        _insert_users([row])
+                    created += 1
+                except IntegrityError:
+                    errors.append({"row": row[0], "username": row[1], "error": "Username already exists"})
+            db.session.commit()
+
+    errors.sort(key=lambda error: error["row"])
+    return {"created": created, "errors": errors}
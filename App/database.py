@@ -1,8 +1,36 @@
+import csv, io, random, threading, time
+from functools import wraps
+from flask import current_app, has_app_context, has_request_context, request
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from flask_migrate import Migrate
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import QueuePool
 
 
-db = SQLAlchemy()
+class RoutingSession(Session):
+    """Sends reads to the replica chosen for a read-only request; everything else to the primary."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not getattr(clause, "is_dml", False):
+            replica = replica_engine()
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def replica_engine():
+    # set by App.replicas.read_only; kept on the request (not g) so it also
+    # covers streamed responses and never leaks into the next request
+    return request.environ.get("app.read_replica") if has_request_context() else None
+
+def use_primary():
+    # sends the rest of a read-only request back to the primary
+    if has_request_context():
+        request.environ.pop("app.read_replica", None)
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 def get_migrate(app):
     return Migrate(app, db)
@@ -11,4 +39,200 @@ def create_db():
     db.create_all()
     
 def init_db(app):
-    db.init_app(app)
\ No newline at end of file
+    configure_engine(app)
+    db.init_app(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == "sqlite":
+                configure_sqlite(engine, app.config)
+
+# SQLite profile for small deployments running the four gunicorn workers on
+# one file: WAL lets readers carry on while a writer commits, NORMAL sync is
+# safe under WAL, and busy_timeout makes a writer wait for the lock instead of
+# failing at once. Writes that still hit "database is locked" are retried by
+# @retry_on_busy.
+
+def configure_sqlite(engine, config):
+    if not config.get("SQLITE_PROFILE", True):
+        return
+    in_memory = engine.url.database in (None, "", ":memory:")
+    pragmas = [
+        ("busy_timeout", config.get("SQLITE_BUSY_TIMEOUT_MS", 5000)),
+        ("cache_size", config.get("SQLITE_CACHE_SIZE", -64000)),  # negative = KiB
+    ]
+    if not in_memory:
+        pragmas = [
+            ("journal_mode", "WAL"),
+            ("synchronous", config.get("SQLITE_SYNCHRONOUS", "NORMAL")),
+            ("mmap_size", config.get("SQLITE_MMAP_SIZE", 268435456)),
+        ] + pragmas
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+def _is_busy(error):
+    message = str(getattr(error, "orig", error)).lower()
+    return "database is locked" in message or "database is busy" in message
+
+def retry_on_busy(fn):
+    """Retries a write controller when SQLite reports the database as locked."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        attempts = current_app.config.get("SQLITE_BUSY_RETRIES", 3) if has_app_context() else 3
+        for attempt in range(attempts + 1):
+            try:
+                return fn(*args, **kwargs)
+            except OperationalError as e:
+                if attempt == attempts or not _is_busy(e):
+                    raise
+                db.session.rollback()
+                # jittered backoff so retrying workers do not collide again
+                time.sleep(0.05 * (2 ** attempt) * (0.5 + random.random()))
+    return wrapper
+
+# Pool sizing for server databases (PostgreSQL in production). Under gevent a
+# worker runs up to worker_connections greenlets, so DB_POOL_SIZE plus
+# DB_MAX_OVERFLOW is the real cap on concurrent queries per worker; the
+# checkout wait stats below show when requests queue for a connection.
+
+class PoolStats:
+    BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.buckets = [0] * (len(self.BUCKETS) + 1)
+
+    def record(self, waited, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            index = next((i for i, bound in enumerate(self.BUCKETS) if waited <= bound), len(self.BUCKETS))
+            self.buckets[index] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_total, 6),
+                "wait_seconds_max": round(self.wait_max, 6),
+                "wait_seconds_avg": round(self.wait_total / self.checkouts, 6) if self.checkouts else 0.0,
+                "wait_buckets": {
+                    **{f"le_{bound}": count for bound, count in zip(self.BUCKETS, self.buckets)},
+                    "le_inf": self.buckets[-1]
+                }
+            }
+
+pool_stats = PoolStats()
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            pool_stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        pool_stats.record(time.perf_counter() - started)
+        return connection
+
+def configure_engine(app):
+    uri = app.config.get("SQLALCHEMY_DATABASE_URI")
+    if not uri or make_url(uri).get_backend_name() == "sqlite":
+        return
+    options = dict(app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+    options.setdefault("poolclass", TimedQueuePool)
+    options.setdefault("pool_size", app.config.get("DB_POOL_SIZE", 10))
+    options.setdefault("max_overflow", app.config.get("DB_MAX_OVERFLOW", 10))
+    options.setdefault("pool_timeout", app.config.get("DB_POOL_TIMEOUT", 30))
+    options.setdefault("pool_recycle", app.config.get("DB_POOL_RECYCLE", 1800))
+    options.setdefault("pool_pre_ping", app.config.get("DB_POOL_PRE_PING", True))
+    timeout = app.config.get("DB_STATEMENT_TIMEOUT_MS")
+    if timeout and make_url(uri).get_backend_name() == "postgresql":
+        connect_args = dict(options.get("connect_args") or {})
+        connect_args.setdefault("options", f"-c statement_timeout={int(timeout)}")
+        options["connect_args"] = connect_args
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+    if make_url(uri).get_driver_name() == "psycopg2":
+        install_gevent_wait_callback()
+
+def install_gevent_wait_callback():
+    # psycopg2 is a C extension that gevent cannot patch; with a wait callback
+    # it runs queries in async mode and yields to the hub while waiting on the
+    # socket, so one slow query no longer blocks every greenlet in the worker
+    from App.offload import _gevent_patched
+    if not _gevent_patched():
+        return False
+    import psycopg2.extensions
+    psycopg2.extensions.set_wait_callback(_gevent_wait_callback)
+    return True
+
+def _gevent_wait_callback(connection, timeout=None):
+    import psycopg2.extensions
+    from gevent.socket import wait_read, wait_write
+    while True:
+        state = connection.poll()
+        if state == psycopg2.extensions.POLL_OK:
+            break
+        elif state == psycopg2.extensions.POLL_READ:
+            wait_read(connection.fileno(), timeout=timeout)
+        elif state == psycopg2.extensions.POLL_WRITE:
+            wait_write(connection.fileno(), timeout=timeout)
+        else:
+            raise psycopg2.OperationalError(f"Bad result from poll: {state!r}")
+
+def bulk_insert(table, rows):
+    # Inserts a list of plain dicts inside the session's current transaction.
+    # PostgreSQL gets a single COPY, everything else one executemany INSERT.
+    if not rows:
+        return 0
+    mark_written(db.session, table.name)
+    connection = db.session.connection()
+    if connection.dialect.name == "postgresql":
+        _copy_rows(connection, table, rows)
+    else:
+        connection.execute(table.insert(), rows)
+    return len(rows)
+
+def mark_written(session, table_name):
+    # lets commit hooks know a table changed even when the ORM did not see it
+    session.info.setdefault("written_tables", set()).add(table_name)
+
+def _copy_rows(connection, table, rows):
+    columns = list(rows[0].keys())
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        # unquoted empty fields are NULL in COPY's CSV format
+        writer.writerow(["" if row[column] is None else row[column] for column in columns])
+    buffer.seek(0)
+
+    preparer = connection.dialect.identifier_preparer
+    statement = "COPY {} ({}) FROM STDIN WITH (FORMAT csv)".format(
+        preparer.format_table(table),
+        ", ".join(preparer.quote(column) for column in columns)
+    )
+    cursor = connection.connection.driver_connection.cursor()
+    try:
+        cursor.copy_expert(statement, buffer)
+    finally:
+        cursor.close()
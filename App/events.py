@@ -0,0 +1,251 @@
+import json, os, queue, sqlite3, threading, time
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+
+from App.database import db
+
+# Roster change notifications for the server-sent events endpoint. Committed
+# shift writes are turned into small delta events and fanned out through an
+# in-process pub/sub bus. With more than one gunicorn worker the events go
+# through a local SQLite "broker" file instead: every worker tails it and
+# delivers new rows to its own subscribers. Under gevent the poller and the
+# subscriber queues are cooperative, so idle streams cost no OS threads.
+
+GLOBAL_CHANNEL = "roster"
+MAX_DELTAS_PER_COMMIT = 200
+
+
+class EventBus:
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channels):
+        subscription = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            for channel in channels:
+                self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription, channels):
+        with self._lock:
+            for channel in channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+    def publish_local(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait(message)
+            except queue.Full:
+                # a stalled client loses deltas; it resyncs on reconnect
+                pass
+
+    def has_subscribers(self):
+        with self._lock:
+            return bool(self._subscribers)
+
+
+class SQLiteBroker:
+    def __init__(self, path, bus, poll_interval=0.5, retention=600):
+        self.path = path
+        self.bus = bus
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._local = threading.local()
+        self._poller = None
+        self._poller_pid = None
+        self._lock = threading.Lock()
+        self._pruned = 0.0
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS events (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "channel TEXT NOT NULL, name TEXT NOT NULL, data TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def publish(self, messages):
+        # every (channel, name, data) of one commit in a single transaction;
+        # rows older than the retention go at most once a minute per worker,
+        # whether or not anything subscribes
+        now = time.time()
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany(
+                "INSERT INTO events (channel, name, data, created) VALUES (?, ?, ?, ?)",
+                [(channel, name, data, now) for channel, name, data in messages]
+            )
+            if now - self._pruned > min(self.retention, 60):
+                connection.execute("DELETE FROM events WHERE created < ?", (now - self.retention,))
+                self._pruned = now
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def since(self, last_id, channels):
+        placeholders = ", ".join("?" for _ in channels)
+        return self._connection().execute(
+            f"SELECT id, channel, name, data FROM events WHERE id > ? AND channel IN ({placeholders}) ORDER BY id",
+            (last_id, *channels)
+        ).fetchall()
+
+    def ensure_polling(self):
+        with self._lock:
+            if self._poller is not None and self._poller_pid == os.getpid():
+                return
+            self._poller = threading.Thread(target=self._poll, name="roster-events", daemon=True)
+            self._poller_pid = os.getpid()
+            self._poller.start()
+
+    def _poll(self):
+        connection = self._connection()
+        last_id = connection.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+        while True:
+            time.sleep(self.poll_interval)
+            if not self.bus.has_subscribers():
+                continue
+            rows = connection.execute(
+                "SELECT id, channel, name, data FROM events WHERE id > ? ORDER BY id", (last_id,)
+            ).fetchall()
+            for event_id, channel, name, data in rows:
+                self.bus.publish_local(channel, (event_id, name, data))
+                last_id = event_id
+
+
+class RosterEvents:
+    def __init__(self, bus, broker=None, heartbeat=15):
+        self.bus = bus
+        self.broker = broker
+        self.heartbeat = heartbeat
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def publish(self, channel, name, payload):
+        self.publish_many([(channel, name, payload)])
+
+    def publish_many(self, messages):
+        messages = [(channel, name, json.dumps(payload)) for channel, name, payload in messages]
+        if not messages:
+            return
+        if self.broker is not None:
+            self.broker.publish(messages)
+            return
+        for channel, name, data in messages:
+            with self._lock:
+                self._next_id += 1
+                event_id = self._next_id
+            self.bus.publish_local(channel, (event_id, name, data))
+
+    def subscribe(self, channels):
+        if self.broker is not None:
+            self.broker.ensure_polling()
+        return self.bus.subscribe(channels)
+
+    def unsubscribe(self, subscription, channels):
+        self.bus.unsubscribe(subscription, channels)
+
+    def missed(self, last_event_id, channels):
+        # call after subscribe(): an event committed in between is then both
+        # replayed and queued, and the stream drops the queued copy by id
+        if self.broker is None or last_event_id is None:
+            return []
+        return [(event_id, name, data) for event_id, channel, name, data in self.broker.since(last_event_id, channels)]
+
+
+def init_events(app):
+    bus = EventBus(app.config.get("EVENTS_QUEUE_SIZE", 100))
+    broker = None
+    if app.config.get("EVENTS_BROKER") == "sqlite":
+        path = app.config.get("EVENTS_BROKER_PATH") or os.path.join(app.instance_path, "events.sqlite3")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        broker = SQLiteBroker(path, bus, app.config.get("EVENTS_POLL_INTERVAL", 0.5), app.config.get("EVENTS_RETENTION", 600))
+    app.extensions["roster_events"] = RosterEvents(bus, broker, app.config.get("EVENTS_HEARTBEAT", 15))
+    _register_listeners()
+
+
+def get_events():
+    return current_app.extensions["roster_events"]
+
+
+def format_sse(event_id, name, data):
+    return f"id: {event_id}\nevent: {name}\ndata: {data}\n\n"
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def _shift_delta(shift, action):
+    state = inspect(shift)
+    previous_staff = [value for value in state.attrs.staff_id.history.deleted if value is not None]
+    return {
+        "action": action,
+        "previous_staff_id": previous_staff[0] if previous_staff else None,
+        "shift": {
+            "id": shift.id,
+            "staff_id": shift.staff_id,
+            "schedule_id": shift.schedule_id,
+            "start_time": _isoformat(shift.start_time),
+            "end_time": _isoformat(shift.end_time),
+            "clock_in": _isoformat(shift.clock_in),
+            "clock_out": _isoformat(shift.clock_out)
+        }
+    }
+
+
+def _after_flush(session, flush_context):
+    deltas = session.info.setdefault("shift_events", [])
+    for action, objects in (("created", session.new), ("updated", session.dirty), ("deleted", session.deleted)):
+        for obj in objects:
+            if getattr(obj, "__tablename__", None) == "shift" and (action != "updated" or session.is_modified(obj)):
+                deltas.append(_shift_delta(obj, action))
+
+
+def _after_commit(session):
+    deltas = session.info.pop("shift_events", [])
+    bulk = "shift" in session.info.get("written_tables", ())
+    if not (deltas or bulk) or not has_app_context() or "roster_events" not in current_app.extensions:
+        return
+    events = get_events()
+    if bulk or len(deltas) > MAX_DELTAS_PER_COMMIT:
+        # too much changed to describe; clients refetch the roster
+        events.publish(GLOBAL_CHANNEL, "refresh", {"reason": "bulk" if bulk else "batch", "count": len(deltas)})
+        return
+    messages = []
+    for delta in deltas:
+        messages.append((GLOBAL_CHANNEL, "shift", delta))
+        for staff_id in {delta["shift"]["staff_id"], delta["previous_staff_id"]} - {None}:
+            messages.append((f"staff:{staff_id}", "shift", delta))
+    events.publish_many(messages)
+
+
+def _after_rollback(session):
+    session.info.pop("shift_events", None)
+
+
+_listeners_registered = False
+
+def _register_listeners():
+    global _listeners_registered
+    if _listeners_registered:
+        return
+    event.listen(db.session, "after_flush", _after_flush)
+    # insert=True runs ahead of the cache's hook, which clears "written_tables"
+    event.listen(db.session, "after_commit", _after_commit, insert=True)
+    event.listen(db.session, "after_rollback", _after_rollback)
+    _listeners_registered = True
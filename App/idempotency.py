@@ -0,0 +1,94 @@
+import base64, hashlib, os, zlib
+from functools import wraps
+from flask import current_app, jsonify, make_response, request
+from flask_jwt_extended import get_jwt_identity
+
+from App.cache import MemoryBackend, SQLiteBackend
+
+# Flaky terminal networks retry clock_in/clock_out and /createShift. A client
+# that sends an Idempotency-Key header gets the stored response back on a
+# retry instead of the controller running (and writing) a second time.
+# Entries are a hashed key plus a compressed response and expire after
+# IDEMPOTENCY_TTL seconds.
+
+REPLAYED_HEADERS = ("Content-Type", "Location", "ETag")
+MAX_KEY_LENGTH = 255
+
+
+def init_idempotency(app):
+    if app.config.get("IDEMPOTENCY_BACKEND") == "sqlite":
+        path = app.config.get("IDEMPOTENCY_BACKEND_PATH") or os.path.join(app.instance_path, "idempotency.sqlite3")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        store = SQLiteBackend(path)
+        store.purge_expired()
+    else:
+        store = MemoryBackend(app.config.get("IDEMPOTENCY_MAX_KEYS", 10000))
+    app.extensions["idempotency_store"] = store
+
+
+def _store_key(key):
+    # scoped to the caller and endpoint so keys cannot collide across users
+    scope = f"{get_jwt_identity()}|{request.method}|{request.path}|{key}"
+    return "idem:" + hashlib.sha256(scope.encode()).hexdigest()[:32]
+
+
+def _fingerprint():
+    return hashlib.sha256(request.get_data()).hexdigest()[:16]
+
+
+def _pack(response):
+    return {
+        "state": "done",
+        "fingerprint": _fingerprint(),
+        "status": response.status_code,
+        "headers": {name: response.headers[name] for name in REPLAYED_HEADERS if name in response.headers},
+        "body": base64.b64encode(zlib.compress(response.get_data())).decode()
+    }
+
+
+def _replay(record):
+    response = make_response(zlib.decompress(base64.b64decode(record["body"])), record["status"])
+    for name, value in record["headers"].items():
+        response.headers[name] = value
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+def idempotent(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get("Idempotency-Key")
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({"error": "Idempotency-Key is too long"}), 400
+
+        store = current_app.extensions["idempotency_store"]
+        store_key = _store_key(key)
+        record = store.get(store_key)
+        if record is None:
+            pending = {"state": "pending", "fingerprint": _fingerprint()}
+            if store.add(store_key, pending, current_app.config.get("IDEMPOTENCY_PENDING_TTL", 60)):
+                return _execute(view, store, store_key, args, kwargs)
+            record = store.get(store_key) or pending
+
+        if record["fingerprint"] != _fingerprint():
+            return jsonify({"error": "Idempotency-Key was already used with a different request"}), 422
+        if record["state"] == "pending":
+            return jsonify({"error": "A request with this Idempotency-Key is still in progress"}), 409
+        return _replay(record)
+    return wrapper
+
+
+def _execute(view, store, store_key, args, kwargs):
+    try:
+        response = make_response(view(*args, **kwargs))
+    except Exception:
+        store.delete(store_key)
+        raise
+    # server errors are not remembered, so the client can safely retry them
+    if response.status_code >= 500 or response.is_streamed:
+        store.delete(store_key)
+    else:
+        store.set(store_key, _pack(response), current_app.config.get("IDEMPOTENCY_TTL", 86400))
+    return response
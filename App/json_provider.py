@@ -0,0 +1,100 @@
+from datetime import date, datetime, time
+from flask import current_app, request
+from flask.json.provider import DefaultJSONProvider
+
+# Flask's default provider runs every response through the stdlib encoder.
+# This one uses orjson (or msgspec) when installed, both of which encode
+# datetimes natively, and falls back to the stdlib otherwise. Select one with
+# JSON_BACKEND = "auto" | "orjson" | "msgspec" | "stdlib".
+#
+# In every backend datetimes, dates and times are written in ISO 8601, the
+# same text the models' isoformat() calls produce, so payloads may carry raw
+# datetime values and let the encoder format them.
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_MIMETYPES = ("application/msgpack", "application/x-msgpack")
+
+
+def iso_default(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    def __init__(self, app):
+        super().__init__(app)
+        self.backend = self._choose_backend(app.config.get("JSON_BACKEND", "auto"))
+        if self.backend == "msgspec":
+            self._encoder = msgspec.json.Encoder(enc_hook=self._fallback, order="sorted" if self.sort_keys else None)
+
+    @staticmethod
+    def _choose_backend(name):
+        available = {"orjson": orjson is not None, "msgspec": msgspec is not None, "stdlib": True}
+        if name == "auto":
+            return next(backend for backend in ("orjson", "msgspec", "stdlib") if available[backend])
+        if not available.get(name):
+            raise RuntimeError(f"JSON_BACKEND {name!r} is not installed")
+        return name
+
+    def _fallback(self, value):
+        # anything the fast encoders do not know goes through Flask's rules
+        if isinstance(value, (datetime, date, time)):
+            return value.isoformat()
+        return self.default(value)
+
+    def dumps(self, obj, **kwargs):
+        if kwargs or self.backend == "stdlib":
+            kwargs.setdefault("default", self._fallback)
+            return super().dumps(obj, **kwargs)
+        return self._encode(obj).decode()
+
+    def _encode(self, obj):
+        if self.backend == "orjson":
+            options = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if self.sort_keys else 0)
+            return orjson.dumps(obj, default=self._fallback, option=options)
+        return self._encoder.encode(obj)
+
+    def loads(self, s, **kwargs):
+        if kwargs or self.backend == "stdlib":
+            return super().loads(s, **kwargs)
+        if self.backend == "orjson":
+            return orjson.loads(s)
+        return msgspec.json.decode(s)
+
+    def response(self, *args, **kwargs):
+        if self.backend == "stdlib" or (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        # skip the bytes -> str -> bytes round trip dumps() would do
+        return self._app.response_class(self._encode(obj) + b"\n", mimetype=self.mimetype)
+
+
+def wants_msgpack():
+    # MessagePack only when the client prefers it over JSON and it is installed
+    if msgpack is None:
+        return False
+    best = request.accept_mimetypes.best_match(("application/json",) + MSGPACK_MIMETYPES, default="application/json")
+    return best in MSGPACK_MIMETYPES
+
+
+def payload_response(payload):
+    """JSON response for payload, or MessagePack if the Accept header asks for it."""
+    if wants_msgpack():
+        body = msgpack.packb(payload, default=iso_default)
+        return current_app.response_class(body, mimetype=request.accept_mimetypes.best_match(MSGPACK_MIMETYPES))
+    return current_app.json.response(payload)
@@ -7,11 +7,20 @@ from werkzeug.datastructures import  FileStorage
 
 from App.database import init_db
 from App.config import load_config
+from App.json_provider import FastJSONProvider
+from App.offload import init_offload
+from App.metrics import init_metrics
+from App.profiling import init_profiling
+from App.cache import init_cache
+from App.events import init_events
+from App.idempotency import init_idempotency
+from App.replicas import init_replicas
 
 
 from App.controllers import (
     setup_jwt,
-    add_auth_context
+    add_auth_context,
+    setup_identity_cache
 )
 
 from App.views import views, setup_admin
@@ -25,12 +34,21 @@ def add_views(app):
 def create_app(overrides={}):
     app = Flask(__name__, static_url_path='/static')
     load_config(app, overrides)
+    app.json = FastJSONProvider(app)
+    init_metrics(app)
+    init_profiling(app)
+    init_offload(app)
     CORS(app)
     add_auth_context(app)
+    setup_identity_cache(app)
     photos = UploadSet('photos', TEXT + DOCUMENTS + IMAGES)
     configure_uploads(app, photos)
     add_views(app)
     init_db(app)
+    init_cache(app)
+    init_replicas(app)
+    init_events(app)
+    init_idempotency(app)
     jwt = setup_jwt(app)
     setup_admin(app)
     @jwt.invalid_token_loader
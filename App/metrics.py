@@ -0,0 +1,291 @@
+import glob, ipaddress, json, os, tempfile, threading, time
+from bisect import bisect_left
+from contextlib import contextmanager
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from App.database import pool_stats, PoolStats
+
+# Request, SQL and schedule generation metrics. Every request records its
+# latency per endpoint, and the number and time of the SQL statements it ran
+# (from engine events, so replica reads count too); schedule generation
+# records its time per strategy. Each gunicorn worker keeps its numbers in
+# memory and writes them to METRICS_DIR/<pid>.json at most every
+# METRICS_FLUSH_INTERVAL seconds; /metrics sums the files of all workers into
+# the Prometheus text format. The same request's numbers go out in a
+# Server-Timing header. /metrics and /health/pool only answer clients listed
+# in METRICS_ALLOWED_ADDRESSES (addresses or networks).
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+METRICS = {
+    "http_requests_total": ("counter", "Requests handled, by endpoint and status."),
+    "http_request_duration_seconds": ("histogram", "Request latency by endpoint."),
+    "db_queries_total": ("counter", "SQL statements executed, by endpoint."),
+    "db_query_duration_seconds_total": ("counter", "Time spent in SQL statements, by endpoint."),
+    "schedule_generation_duration_seconds": ("histogram", "Schedule generation time by strategy."),
+    "db_pool_checkout_wait_seconds": ("histogram", "Time spent waiting for a pooled connection."),
+    "db_pool_checkout_timeouts_total": ("counter", "Pool checkouts that timed out.")
+}
+
+
+class Registry:
+    """Counters and histograms of one process, keyed by name and labels."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        # counts are per bucket here (the last one is +Inf); render() sums them up
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.histograms.get(key)
+            if series is None:
+                series = self.histograms[key] = {"bounds": list(self.buckets), "counts": [0] * (len(self.buckets) + 1), "sum": 0.0}
+            series["counts"][index] += 1
+            series["sum"] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "counters": [[name, dict(labels), value] for (name, labels), value in self.counters.items()],
+                "histograms": [
+                    [name, dict(labels), {"bounds": series["bounds"], "counts": list(series["counts"]), "sum": series["sum"]}]
+                    for (name, labels), series in self.histograms.items()
+                ]
+            }
+
+
+class Metrics:
+    def __init__(self, directory=None, flush_interval=1.0, buckets=DEFAULT_BUCKETS):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.buckets = buckets
+        self.registry = Registry(buckets)
+        self._flushed = 0.0
+
+    def current(self):
+        if self.registry.pid != os.getpid():
+            # a forked child starts from zero instead of repeating its parent's counts
+            self.registry = Registry(self.buckets)
+        return self.registry
+
+    def snapshot(self):
+        snapshot = self.current().snapshot()
+        pool = pool_stats.snapshot()
+        if pool["checkouts"] or pool["timeouts"]:
+            counts = list(pool["wait_buckets"].values())
+            snapshot["histograms"].append(["db_pool_checkout_wait_seconds", {}, {
+                "bounds": list(PoolStats.BUCKETS), "counts": counts, "sum": pool["wait_seconds_total"]
+            }])
+            snapshot["counters"].append(["db_pool_checkout_timeouts_total", {}, pool["timeouts"]])
+        return snapshot
+
+    def maybe_flush(self):
+        if self.directory and time.monotonic() - self._flushed >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if not self.directory:
+            return
+        self._flushed = time.monotonic()
+        # written to a temporary file and renamed, so readers never see half of it
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(handle, "w") as file:
+            json.dump(self.snapshot(), file)
+        os.replace(temporary, os.path.join(self.directory, f"{os.getpid()}.json"))
+
+    def collect(self):
+        """Snapshots of every worker that has written to the directory, this one included."""
+        if not self.directory:
+            return [self.snapshot()]
+        self.flush()
+        snapshots = []
+        for path in glob.glob(os.path.join(self.directory, "*.json")):
+            try:
+                with open(path) as file:
+                    snapshots.append(json.load(file))
+            except (OSError, ValueError):
+                # a worker's file removed while the directory was listed
+                continue
+        return snapshots
+
+    def render(self):
+        return render(merge(self.collect()))
+
+
+def merge(snapshots):
+    counters, histograms = {}, {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot["counters"]:
+            key = (name, tuple(sorted(labels.items())))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, series in snapshot["histograms"]:
+            key = (name, tuple(sorted(labels.items())))
+            total = histograms.get(key)
+            if total is None or total["bounds"] != series["bounds"]:
+                # first sighting, or the buckets were reconfigured between runs
+                total = histograms[key] = {"bounds": series["bounds"], "counts": [0] * len(series["counts"]), "sum": 0.0}
+            total["counts"] = [a + b for a, b in zip(total["counts"], series["counts"])]
+            total["sum"] += series["sum"]
+    return counters, histograms
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(merged):
+    counters, histograms = merged
+    series_by_name = {}
+    for (name, labels), value in counters.items():
+        series_by_name.setdefault(name, []).append((labels, value))
+    for (name, labels), series in histograms.items():
+        series_by_name.setdefault(name, []).append((labels, series))
+
+    lines = []
+    for name in sorted(series_by_name):
+        kind, description = METRICS.get(name, ("untyped", name))
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in sorted(series_by_name[name], key=lambda item: item[0]):
+            if kind != "histogram":
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(value["bounds"] + ["+Inf"], value["counts"]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels, le=bound if bound == '+Inf' else _number(float(bound)))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(float(value['sum']))}")
+            lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def init_metrics(app):
+    if not app.config.get("METRICS_ENABLED", True):
+        app.extensions.pop("metrics", None)
+        return
+    # without a directory the numbers stay in this process; gunicorn_config
+    # sets one so that /metrics can add up every worker
+    directory = app.config.get("METRICS_DIR") or None
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    first = "metrics" not in app.extensions
+    app.extensions["metrics"] = Metrics(
+        directory,
+        app.config.get("METRICS_FLUSH_INTERVAL", 1.0),
+        app.config.get("METRICS_BUCKETS") or DEFAULT_BUCKETS
+    )
+    if first:
+        app.before_request(_start_request)
+        app.after_request(_finish_request)
+    _register_listeners()
+
+
+def get_metrics():
+    return current_app.extensions.get("metrics") if has_app_context() else None
+
+
+def client_allowed():
+    # whether the caller may read /metrics and /health/pool, which show
+    # endpoints, query counts and pool state
+    try:
+        address = ipaddress.ip_address(request.remote_addr or "")
+    except ValueError:
+        return False
+    for allowed in current_app.config.get("METRICS_ALLOWED_ADDRESSES") or []:
+        if address in ipaddress.ip_network(allowed, strict=False):
+            return True
+    return False
+
+
+def _start_request():
+    if get_metrics() is not None:
+        g._request_metrics = {"start": time.perf_counter(), "queries": 0, "sql": 0.0, "timings": []}
+
+
+def _finish_request(response):
+    metrics = get_metrics()
+    current = g.pop("_request_metrics", None)
+    if metrics is None or current is None:
+        return response
+    elapsed = time.perf_counter() - current["start"]
+    endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    registry = metrics.current()
+    registry.inc("http_requests_total", {"endpoint": endpoint, "method": request.method, "status": response.status_code})
+    registry.observe("http_request_duration_seconds", {"endpoint": endpoint, "method": request.method}, elapsed)
+    if current["queries"]:
+        registry.inc("db_queries_total", {"endpoint": endpoint}, current["queries"])
+        registry.inc("db_query_duration_seconds_total", {"endpoint": endpoint}, current["sql"])
+
+    if current_app.config.get("SERVER_TIMING_ENABLED", True):
+        timings = [f"app;dur={elapsed * 1000:.1f}", f'db;desc="{current["queries"]} queries";dur={current["sql"] * 1000:.1f}']
+        timings += [f'{name};desc="{_escape(description)}";dur={seconds * 1000:.1f}' for name, description, seconds in current["timings"]]
+        response.headers["Server-Timing"] = ", ".join(timings)
+    metrics.maybe_flush()
+    return response
+
+
+@contextmanager
+def timed_generation(strategy):
+    """Records how long the enclosed schedule generation took under its strategy name."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics = get_metrics()
+        if metrics is not None:
+            metrics.current().observe("schedule_generation_duration_seconds", {"strategy": strategy}, elapsed)
+            if has_request_context() and "_request_metrics" in g:
+                g._request_metrics["timings"].append(("generate", strategy, elapsed))
+
+
+_listeners_registered = False
+
+
+def _register_listeners():
+    global _listeners_registered
+    if _listeners_registered:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _listeners_registered = True
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_metrics_started", None)
+    if started is None or not has_request_context():
+        return
+    current = g.get("_request_metrics")
+    if current is not None:
+        current["queries"] += 1
+        current["sql"] += time.perf_counter() - started
@@ -0,0 +1,171 @@
+from datetime import datetime, timedelta
+from flask import current_app, has_app_context
+from sqlalchemy import event, select, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from App.database import db
+from .shift import Shift
+
+# Scheduled versus worked time per staff member and (Monday aligned) week.
+# Rows are kept current inside the same transaction as the shift writes: just
+# before a flush, every new, changed or deleted Shift has its old contribution
+# subtracted and its new one added with a single upsert, so reading a week of
+# attendance is one row per staff member. Times are stored in whole seconds so
+# the increments never drift; rebuild() recomputes everything from Shift rows.
+
+SHIFT_COLUMNS = ("staff_id", "start_time", "end_time", "clock_in", "clock_out")
+COUNTERS = ("scheduled_shifts", "scheduled_seconds", "worked_seconds", "late_arrivals", "late_seconds", "unpunched_shifts")
+
+
+class AttendanceSummary(db.Model):
+    staff_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    week_start = db.Column(db.Date, primary_key=True)
+    scheduled_shifts = db.Column(db.Integer, nullable=False, default=0)
+    scheduled_seconds = db.Column(db.Integer, nullable=False, default=0)
+    worked_seconds = db.Column(db.Integer, nullable=False, default=0)
+    late_arrivals = db.Column(db.Integer, nullable=False, default=0)
+    late_seconds = db.Column(db.Integer, nullable=False, default=0)
+    unpunched_shifts = db.Column(db.Integer, nullable=False, default=0)
+
+    def get_json(self):
+        week_end = self.week_start + timedelta(days=7)
+        return {
+            "staff_id": self.staff_id,
+            "week_start": self.week_start.isoformat(),
+            "scheduled_shifts": self.scheduled_shifts,
+            "scheduled_hours": round(self.scheduled_seconds / 3600, 2),
+            "worked_hours": round(self.worked_seconds / 3600, 2),
+            "late_arrivals": self.late_arrivals,
+            "late_minutes": round(self.late_seconds / 60, 1),
+            # shifts without a clock-in only count as no-shows once the week is over
+            "unpunched_shifts": self.unpunched_shifts,
+            "no_shows": self.unpunched_shifts if datetime.combine(week_end, datetime.min.time()) <= datetime.now() else None
+        }
+
+    @staticmethod
+    def contribution(values, grace_seconds):
+        # (key, counters) a shift with these column values adds to the summary
+        staff_id, start, end, clock_in, clock_out = (values[column] for column in SHIFT_COLUMNS)
+        if staff_id is None or start is None or end is None:
+            return None, None
+        late = int((clock_in - start).total_seconds()) if clock_in is not None else 0
+        counters = {
+            "scheduled_shifts": 1,
+            "scheduled_seconds": int((end - start).total_seconds()),
+            "worked_seconds": int((clock_out - clock_in).total_seconds()) if clock_in and clock_out else 0,
+            "late_arrivals": 1 if late > grace_seconds else 0,
+            "late_seconds": late if late > grace_seconds else 0,
+            "unpunched_shifts": 0 if clock_in is not None else 1
+        }
+        return (staff_id, start.date() - timedelta(days=start.weekday())), counters
+
+    @classmethod
+    def apply_rows(cls, connection, rows, sign=1):
+        """Adds (or with sign=-1 removes) plain shift row dicts, e.g. from a bulk insert."""
+        deltas = {}
+        grace = _grace_seconds()
+        for row in rows:
+            key, counters = cls.contribution({column: row.get(column) for column in SHIFT_COLUMNS}, grace)
+            if key is not None:
+                _accumulate(deltas, key, counters, sign)
+        _upsert(connection, deltas)
+
+    @classmethod
+    def rebuild(cls, batch_size=5000):
+        # backfill: recompute every row from the shift table in one pass
+        deltas = {}
+        grace = _grace_seconds()
+        columns = [getattr(Shift, column) for column in SHIFT_COLUMNS]
+        result = db.session.execute(select(*columns).where(Shift.staff_id.is_not(None)).execution_options(yield_per=batch_size))
+        for row in result:
+            key, counters = cls.contribution(row._mapping, grace)
+            if key is not None:
+                _accumulate(deltas, key, counters, 1)
+        db.session.execute(cls.__table__.delete())
+        if deltas:
+            db.session.execute(cls.__table__.insert(), [
+                {"staff_id": staff_id, "week_start": week_start, **counters}
+                for (staff_id, week_start), counters in deltas.items()
+            ])
+        db.session.commit()
+        return len(deltas)
+
+
+def _grace_seconds():
+    minutes = current_app.config.get("PAYROLL_GRACE_MINUTES", 5) if has_app_context() else 5
+    return minutes * 60
+
+
+def _accumulate(deltas, key, counters, sign):
+    total = deltas.setdefault(key, dict.fromkeys(COUNTERS, 0))
+    for name, value in counters.items():
+        total[name] += sign * value
+
+
+def _upsert(connection, deltas):
+    rows = [
+        {"staff_id": staff_id, "week_start": week_start, **counters}
+        for (staff_id, week_start), counters in deltas.items()
+        if any(counters.values())
+    ]
+    if not rows:
+        return
+    table = AttendanceSummary.__table__
+    dialect = postgresql if connection.dialect.name == "postgresql" else sqlite
+    statement = dialect.insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.staff_id, table.c.week_start],
+        set_={name: table.c[name] + statement.excluded[name] for name in COUNTERS}
+    )
+    connection.execute(statement, rows)
+
+
+def _old_values(shift):
+    state = inspect(shift)
+    values = {}
+    for column in SHIFT_COLUMNS:
+        history = state.attrs[column].history
+        if history.deleted:
+            values[column] = history.deleted[0]
+        elif history.added:
+            # active_history loads the old value on set, so nothing deleted means it was NULL
+            values[column] = None
+        else:
+            values[column] = getattr(shift, column)
+    return values
+
+
+def _new_values(shift):
+    values = {column: getattr(shift, column) for column in SHIFT_COLUMNS}
+    if values["staff_id"] is None and shift.staff is not None:
+        # assigned through the relationship; the foreign key is synced during the flush
+        values["staff_id"] = shift.staff.id
+    return values
+
+
+@event.listens_for(db.session, "before_flush")
+def _before_flush(session, flush_context, instances):
+    deltas = {}
+    grace = _grace_seconds()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, Shift):
+            continue
+        if obj in session.deleted:
+            changes = [(_old_values(obj), -1)]
+        elif obj in session.new:
+            changes = [(_new_values(obj), 1)]
+        else:
+            changes = [(_old_values(obj), -1), (_new_values(obj), 1)]
+        for values, sign in changes:
+            key, counters = AttendanceSummary.contribution(values, grace)
+            if key is not None:
+                _accumulate(deltas, key, counters, sign)
+    if deltas:
+        _upsert(session.connection(), deltas)
+
+
+def _load_old_value(target, value, oldvalue, initiator):
+    # no-op; registering it with active_history makes a set load the old value
+    pass
+
+for _column in SHIFT_COLUMNS:
+    event.listen(getattr(Shift, _column), "set", _load_old_value, active_history=True)
@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select, func
+from sqlalchemy.exc import IntegrityError
+from App.database import db, bulk_insert
+from .shift import Shift
+
+# A recurring weekly shift pattern. Templates are expanded into concrete
+# Shift rows one (Monday aligned) week at a time; ShiftTemplateExpansion
+# records which weeks each template has already produced so a week is never
+# expanded twice.
+
+class ShiftTemplate(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=True)
+    weekday = db.Column(db.Integer, nullable=False)  # 0 = Monday ... 6 = Sunday
+    start_time = db.Column(db.Time, nullable=False)
+    end_time = db.Column(db.Time, nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=1)
+    active = db.Column(db.Boolean, nullable=False, default=True)
+
+    def __init__(self, weekday, start_time, end_time, count=1, name=None):
+        if weekday not in range(7):
+            raise ValueError("weekday must be between 0 (Monday) and 6 (Sunday)")
+        if count < 1:
+            raise ValueError("count must be at least 1")
+        self.weekday = weekday
+        self.start_time = start_time
+        self.end_time = end_time
+        self.count = count
+        self.name = name
+        self.active = True
+
+    def occurrence(self, week_start):
+        day = week_start + timedelta(days=self.weekday)
+        start = datetime.combine(day, self.start_time)
+        end = datetime.combine(day, self.end_time)
+        if end <= start:  # overnight shift
+            end += timedelta(days=1)
+        return start, end
+
+    def get_json(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "weekday": self.weekday,
+            "start_time": self.start_time.strftime("%H:%M"),
+            "end_time": self.end_time.strftime("%H:%M"),
+            "count": self.count,
+            "active": self.active
+        }
+
+    @staticmethod
+    def week_of(day):
+        if isinstance(day, datetime):
+            day = day.date()
+        return day - timedelta(days=day.weekday())
+
+    @classmethod
+    def expand(cls, week_start, weeks=1):
+        first_week = cls.week_of(week_start)
+        week_starts = [first_week + timedelta(weeks=i) for i in range(weeks)]
+        for attempt in range(3):
+            try:
+                return cls._expand_weeks(week_starts)
+            except IntegrityError:
+                # a concurrent expansion committed one of these weeks first;
+                # its rows stand, so only the weeks still missing are retried
+                db.session.rollback()
+        return 0
+
+    @classmethod
+    def _expand_weeks(cls, week_starts):
+        templates = db.session.scalars(select(cls).filter_by(active=True)).all()
+        if not templates:
+            return 0
+
+        done = set(db.session.execute(
+            select(ShiftTemplateExpansion.template_id, ShiftTemplateExpansion.week_start)
+            .where(ShiftTemplateExpansion.week_start.in_(week_starts))
+        ).all())
+
+        shifts = []
+        expansions = []
+        for week in week_starts:
+            for template in templates:
+                if (template.id, week) in done:
+                    continue
+                start, end = template.occurrence(week)
+                shifts.extend(
+                    {"staff_id": None, "schedule_id": None, "start_time": start, "end_time": end}
+                    for _ in range(template.count)
+                )
+                expansions.append({"template_id": template.id, "week_start": week, "expanded_at": datetime.now()})
+
+        # the expansion rows share the transaction with the shifts, and their
+        # primary key stops a concurrent expansion of the same week
+        bulk_insert(ShiftTemplateExpansion.__table__, expansions)
+        bulk_insert(Shift.__table__, shifts)
+        db.session.commit()
+        return len(shifts)
+
+    @classmethod
+    def expand_if_empty(cls, week_start):
+        first_day = cls.week_of(week_start)
+        window_start = datetime.combine(first_day, datetime.min.time())
+        window_end = window_start + timedelta(weeks=1)
+        existing = db.session.scalar(
+            select(func.count(Shift.id)).where(Shift.start_time >= window_start, Shift.start_time < window_end)
+        )
+        if existing:
+            return 0
+        return cls.expand(first_day)
+
+
+class ShiftTemplateExpansion(db.Model):
+    template_id = db.Column(db.Integer, db.ForeignKey("shift_template.id"), primary_key=True)
+    week_start = db.Column(db.Date, primary_key=True)
+    expanded_at = db.Column(db.DateTime, nullable=False)
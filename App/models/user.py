@@ -1,5 +1,6 @@
 from werkzeug.security import check_password_hash, generate_password_hash
 from App.database import db
+from App.offload import run
 from datetime import datetime
 
 class User(db.Model):
@@ -30,6 +31,7 @@ class User(db.Model):
         self.password = generate_password_hash(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password, password)
+        # hashing is CPU bound, so it runs in the offload pool when one is configured
+        return run(check_password_hash, self.password, password)
 
 
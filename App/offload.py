@@ -0,0 +1,111 @@
+import atexit
+import multiprocessing
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from threading import Lock
+
+# Password hashing and strategy.distribute() are CPU bound. Under gunicorn's
+# gevent workers they block the hub and stall every other greenlet on the
+# worker, so they are submitted to a shared process pool instead. The pool is
+# created lazily in each worker (after gunicorn forks) and is sized with
+# OFFLOAD_WORKERS; 0 keeps the old behaviour of running everything inline.
+
+_settings = {"workers": 0, "timeout": 30, "start_method": "spawn"}
+_pool = None
+_pool_lock = Lock()
+
+
+def init_offload(app):
+    _settings["workers"] = app.config.get("OFFLOAD_WORKERS", 0)
+    _settings["timeout"] = app.config.get("OFFLOAD_TIMEOUT", 30)
+    _settings["start_method"] = app.config.get("OFFLOAD_START_METHOD", "spawn")
+
+
+def offload_enabled():
+    return bool(_settings["workers"])
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                context = multiprocessing.get_context(_settings["start_method"])
+                _pool = ProcessPoolExecutor(max_workers=_settings["workers"], mp_context=context)
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+atexit.register(shutdown_pool)
+
+
+def _gevent_patched():
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_anything_patched()
+
+
+class OffloadFuture:
+    """Wraps a pool future so waiting on it yields to the gevent hub."""
+
+    def __init__(self, future):
+        self.future = future
+
+    def done(self):
+        return self.future.done()
+
+    def result(self, timeout=None):
+        if self.future.done() or not _gevent_patched():
+            return self.future.result(timeout)
+
+        import gevent
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delay = 0.001
+        # Polling done() never blocks, so other greenlets (including the
+        # executor's result handler) keep running while we wait.
+        while not self.future.done():
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError("Offloaded task timed out")
+            gevent.sleep(delay)
+            delay = min(delay * 2, 0.02)
+        return self.future.result()
+
+
+def submit(fn, *args):
+    if not offload_enabled():
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return OffloadFuture(future)
+    return OffloadFuture(get_pool().submit(fn, *args))
+
+
+def run(fn, *args):
+    return submit(fn, *args).result(_settings["timeout"])
+
+
+
+def run_many(fn, items, chunksize=64):
+    items = list(items)
+    if not offload_enabled() or len(items) < 2:
+        return [fn(*args) for args in items]
+    # one task per chunk keeps the pickling overhead per item small
+    futures = [submit(_run_chunk, fn, items[i:i + chunksize]) for i in range(0, len(items), chunksize)]
+    results = []
+    for future in futures:
+        results.extend(future.result(_settings["timeout"]))
+    return results
+
+
+def _run_chunk(fn, chunk):
+    return [fn(*args) for args in chunk]
@@ -0,0 +1,265 @@
+import cProfile, glob, json, os, pstats, random, time
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Opt-in profiling (PROFILING_ENABLED). Requests to PROFILE_ENDPOINTS (rule
+# paths or endpoint names; all when empty), sampled at PROFILE_SAMPLE_RATE,
+# run under cProfile with every SQL statement and its time noted; the ones
+# slower than PROFILE_SLOW_MS are written out. Every
+# ScheduleGenerator.generateSchedule run is written regardless of its time
+# (PROFILE_GENERATIONS). Each profile is a <id>.prof file (pstats format, for
+# snakeviz and friends) plus a <id>.json summary in PROFILE_DIR, of which the
+# newest PROFILE_KEEP are kept; `flask profile list` shows them.
+#
+# cProfile follows a thread, so under gevent a request's profile also holds
+# whatever other greenlets ran on that worker while it waited.
+
+TOP_FUNCTIONS = 25
+
+_active = ContextVar("active_profile", default=None)
+
+
+class Capture:
+    def __init__(self, kind, name, max_statements):
+        self.kind = kind
+        self.name = name
+        self.max_statements = max_statements
+        self.started_at = datetime.now()
+        self.statements = []
+        self.statement_count = 0
+        self.sql_seconds = 0.0
+        self.keep = False
+        self.elapsed = None
+        self.profiler = None
+        self.outer = None
+        self._token = None
+
+    def start(self):
+        outer = self.outer = _active.get()
+        if outer is not None and outer.profiler is not None:
+            # only one profiler can run per thread; the outer one already covers
+            # this block, so make sure it is written
+            outer.keep = True
+        else:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+                self.profiler = profiler
+            except ValueError:
+                # another profiler already runs on this thread (a capture in
+                # another greenlet, or a debugger); keep the SQL list only
+                pass
+        self._token = _active.set(self)
+        self._started = time.perf_counter()
+        return self
+
+    def stop(self):
+        self.elapsed = time.perf_counter() - self._started
+        if self.profiler is not None:
+            self.profiler.disable()
+        if self._token is not None:
+            _active.reset(self._token)
+            self._token = None
+        return self
+
+    def add_statement(self, statement, seconds):
+        capture = self
+        while capture is not None:
+            capture.statement_count += 1
+            capture.sql_seconds += seconds
+            if len(capture.statements) < capture.max_statements:
+                capture.statements.append({"sql": statement, "ms": round(seconds * 1000, 3)})
+            capture = capture.outer
+
+
+def profile_directory(app):
+    return app.config.get("PROFILE_DIR") or os.path.join(app.instance_path, "profiles")
+
+
+def _endpoints(app):
+    endpoints = app.config.get("PROFILE_ENDPOINTS") or []
+    if isinstance(endpoints, str):
+        endpoints = [endpoint.strip() for endpoint in endpoints.split(",") if endpoint.strip()]
+    return set(endpoints)
+
+
+def init_profiling(app):
+    first = "profiler" not in app.extensions
+    if app.config.get("PROFILING_ENABLED", False):
+        os.makedirs(profile_directory(app), exist_ok=True)
+        app.extensions["profiler"] = {
+            "directory": profile_directory(app),
+            "endpoints": _endpoints(app),
+            "sample_rate": app.config.get("PROFILE_SAMPLE_RATE", 1.0),
+            "slow_seconds": app.config.get("PROFILE_SLOW_MS", 500) / 1000,
+            "generations": app.config.get("PROFILE_GENERATIONS", True),
+            "keep": app.config.get("PROFILE_KEEP", 50),
+            "max_statements": app.config.get("PROFILE_MAX_STATEMENTS", 200)
+        }
+    else:
+        app.extensions["profiler"] = None
+    if first:
+        app.before_request(_start_request)
+        app.after_request(_finish_request)
+        app.teardown_request(_abandon_request)
+    _register_listeners()
+
+
+def _settings():
+    return current_app.extensions.get("profiler") if has_app_context() else None
+
+
+def _wanted(settings):
+    endpoints = settings["endpoints"]
+    if endpoints and request.endpoint not in endpoints and (request.url_rule is None or request.url_rule.rule not in endpoints):
+        return False
+    return random.random() < settings["sample_rate"]
+
+
+def _start_request():
+    settings = _settings()
+    if settings is None or not _wanted(settings):
+        return
+    rule = request.url_rule.rule if request.url_rule is not None else request.path
+    g._profile = Capture("request", f"{request.method} {rule}", settings["max_statements"]).start()
+
+
+def _finish_request(response):
+    capture = g.pop("_profile", None)
+    if capture is not None:
+        _finish(capture.stop(), status=response.status_code)
+    return response
+
+
+def _abandon_request(error):
+    # after_request did not run (an error escaped the response handling)
+    capture = g.pop("_profile", None)
+    if capture is not None:
+        _finish(capture.stop(), status=500)
+
+
+def _finish(capture, **details):
+    settings = _settings()
+    if settings is None:
+        return
+    if capture.kind == "request" and not capture.keep and capture.elapsed < settings["slow_seconds"]:
+        return
+    write_profile(settings["directory"], capture, settings["keep"], **details)
+
+
+def profile_generation(method):
+    """Profiles every run of a ScheduleGenerator.generateSchedule-like method."""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        settings = _settings()
+        if settings is None or not settings["generations"]:
+            return method(self, *args, **kwargs)
+        strategy = type(self.strategy).__name__ if self.strategy is not None else "None"
+        capture = Capture("generation", strategy, settings["max_statements"]).start()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            _finish(capture.stop())
+    return wrapper
+
+
+def _top_functions(profiler):
+    try:
+        stats = pstats.Stats(profiler)
+    except TypeError:
+        # nothing was recorded
+        return []
+    rows = []
+    for (filename, line, function), (_, calls, total, cumulative, _) in stats.stats.items():
+        rows.append({
+            "function": f"{filename}:{line}({function})",
+            "calls": calls,
+            "total_ms": round(total * 1000, 3),
+            "cumulative_ms": round(cumulative * 1000, 3)
+        })
+    rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+    return rows[:TOP_FUNCTIONS]
+
+
+def write_profile(directory, capture, keep=50, **details):
+    profile_id = f"{capture.started_at:%Y%m%dT%H%M%S%f}-{capture.kind}-{os.getpid()}"
+    summary = {
+        "id": profile_id,
+        "kind": capture.kind,
+        "name": capture.name,
+        "started": capture.started_at.isoformat(),
+        "duration_ms": round(capture.elapsed * 1000, 3),
+        **details,
+        "sql": {
+            "count": capture.statement_count,
+            "total_ms": round(capture.sql_seconds * 1000, 3),
+            "statements": capture.statements
+        },
+        "top": _top_functions(capture.profiler) if capture.profiler is not None else []
+    }
+    if capture.profiler is not None:
+        capture.profiler.dump_stats(os.path.join(directory, f"{profile_id}.prof"))
+    with open(os.path.join(directory, f"{profile_id}.json"), "w") as file:
+        json.dump(summary, file, indent=1)
+    _rotate(directory, keep)
+    return profile_id
+
+
+def _rotate(directory, keep):
+    # ids start with the capture time, so name order is age order
+    summaries = sorted(glob.glob(os.path.join(directory, "*.json")))
+    for path in summaries[:max(len(summaries) - keep, 0)]:
+        for stale in (path, path[:-len(".json")] + ".prof"):
+            try:
+                os.remove(stale)
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles(directory):
+    """Summaries of the kept profiles, newest first."""
+    profiles = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.json")), reverse=True):
+        try:
+            with open(path) as file:
+                profiles.append(json.load(file))
+        except (OSError, ValueError):
+            # rotated away by another worker while listing
+            continue
+    return profiles
+
+
+def load_profile(directory, profile_id):
+    path = os.path.join(directory, f"{os.path.basename(profile_id)}.json")
+    if not os.path.exists(path):
+        raise ValueError(f"No profile {profile_id}")
+    with open(path) as file:
+        return json.load(file)
+
+
+_listeners_registered = False
+
+
+def _register_listeners():
+    global _listeners_registered
+    if _listeners_registered:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _listeners_registered = True
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _active.get() is not None and context is not None:
+        context._profile_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    capture = _active.get()
+    started = getattr(context, "_profile_started", None)
+    if capture is not None and started is not None:
+        capture.add_statement(statement, time.perf_counter() - started)
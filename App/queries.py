@@ -0,0 +1,41 @@
+from sqlalchemy import bindparam, inspect, select
+from sqlalchemy.orm.util import identity_key
+
+from App.database import db
+from App.models import User, Shift
+
+# Hot-path lookups (JWT user loading, login, clock in/out) as select()
+# constructs built once at import time with bound parameters. The statement
+# object is reused, so its cache key is memoized and SQL compilation happens
+# once per process; a lookup only binds the new value.
+
+USER_BY_ID = select(User).where(User.id == bindparam("user_id"))
+USER_BY_USERNAME = select(User).where(User.username == bindparam("username"))
+SHIFT_BY_ID = select(Shift).where(Shift.id == bindparam("shift_id"))
+
+
+def _identity_mapped(cls, pk):
+    # same shortcut Session.get takes: an object already loaded (and not
+    # expired) in this session is returned without a query
+    instance = db.session.identity_map.get(identity_key(cls, pk))
+    if instance is not None and not inspect(instance).expired:
+        return instance
+    return None
+
+
+def user_by_id(user_id):
+    user = _identity_mapped(User, user_id)
+    if user is None:
+        user = db.session.execute(USER_BY_ID, {"user_id": user_id}).scalar_one_or_none()
+    return user
+
+
+def user_by_username(username):
+    return db.session.execute(USER_BY_USERNAME, {"username": username}).scalar_one_or_none()
+
+
+def shift_by_id(shift_id):
+    shift = _identity_mapped(Shift, shift_id)
+    if shift is None:
+        shift = db.session.execute(SHIFT_BY_ID, {"shift_id": shift_id}).scalar_one_or_none()
+    return shift
@@ -0,0 +1,110 @@
+import itertools, threading
+from functools import wraps
+from flask import current_app, has_request_context, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import create_engine, event
+
+from App.database import db, configure_sqlite
+from App.cache import get_cache
+
+# Optional read replicas. GET endpoints marked @read_only run their queries on
+# one of SQLALCHEMY_REPLICA_URIS (round robin); writes, flushes and every
+# other endpoint stay on the primary. A user who has just written is pinned
+# to the primary for REPLICA_STICKY_SECONDS so they always see their own
+# change. The pin lives in the cache's shared store, so it holds across
+# gunicorn workers.
+
+
+def _replica_uris(app):
+    uris = app.config.get("SQLALCHEMY_REPLICA_URIS") or []
+    if isinstance(uris, str):
+        uris = [uri.strip() for uri in uris.split(",") if uri.strip()]
+    return uris
+
+
+def init_replicas(app):
+    previous = app.extensions.get("read_replicas")
+    if previous:
+        for engine in previous["engines"]:
+            engine.dispose()
+
+    engines = []
+    for uri in _replica_uris(app):
+        if uri.startswith("sqlite"):
+            engine = create_engine(uri)
+            configure_sqlite(engine, app.config)
+        else:
+            options = dict(app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+            engine = create_engine(uri, **options)
+        engines.append(engine)
+    app.extensions["read_replicas"] = {"engines": engines, "cycle": itertools.cycle(engines), "lock": threading.Lock()}
+    _register_listeners()
+
+
+def _sticky_key(cache, identity):
+    # namespaced like the cache's own keys, so apps on other databases that
+    # share the store do not pin each other's users
+    return f"{cache.namespace}sticky:{identity}"
+
+
+def _current_identity():
+    try:
+        return get_jwt_identity()
+    except RuntimeError:
+        # the request was not authenticated with a JWT
+        return None
+
+
+def pinned_to_primary(identity):
+    cache = get_cache()
+    return identity is not None and bool(cache.versions.get(_sticky_key(cache, identity)))
+
+
+def _next_replica():
+    replicas = current_app.extensions.get("read_replicas")
+    if not replicas or not replicas["engines"]:
+        return None
+    with replicas["lock"]:
+        return next(replicas["cycle"])
+
+
+def read_only(view):
+    """Routes the view's queries to a replica unless the caller has just written."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        replica = _next_replica()
+        if replica is not None and not pinned_to_primary(_current_identity()):
+            request.environ["app.read_replica"] = replica
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def _after_flush(session, flush_context):
+    session.info["replica_wrote"] = True
+
+
+def _after_commit(session):
+    wrote = session.info.pop("replica_wrote", False) or bool(session.info.get("written_tables"))
+    if not wrote or not has_request_context() or not current_app.extensions.get("read_replicas", {}).get("engines"):
+        return
+    identity = _current_identity()
+    if identity is not None:
+        cache = get_cache()
+        cache.versions.set(_sticky_key(cache, identity), 1, current_app.config.get("REPLICA_STICKY_SECONDS", 5))
+
+
+def _after_rollback(session):
+    session.info.pop("replica_wrote", None)
+
+
+_listeners_registered = False
+
+def _register_listeners():
+    global _listeners_registered
+    if _listeners_registered:
+        return
+    event.listen(db.session, "after_flush", _after_flush)
+    # ahead of the cache hook, which clears "written_tables"
+    event.listen(db.session, "after_commit", _after_commit, insert=True)
+    event.listen(db.session, "after_rollback", _after_rollback)
+    _listeners_registered = True
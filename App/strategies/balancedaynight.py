@@ -2,6 +2,10 @@ from .scheduling_strategy import SchedulingStrategy
 
 
 
+# shifts starting at or after NIGHT_START_HOUR, or before NIGHT_END_HOUR, are night shifts
+NIGHT_START_HOUR = 18
+NIGHT_END_HOUR = 6
+
 # again this function was moved to here as it is the only strategy that uses it.
 
 def get_shift_type(shift):
@@ -13,7 +17,7 @@ def get_shift_type(shift):
     if startTime is not None:
         if hasattr(startTime, "hour"):
             hour = startTime.hour
-            if hour >= 18 or hour < 6:
+            if hour >= NIGHT_START_HOUR or hour < NIGHT_END_HOUR:
                 return "night"
             else:
                 return "day"
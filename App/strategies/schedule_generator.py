@@ -1,5 +1,19 @@
-from App.models import Schedule, Staff, Shift
+from collections import namedtuple
+
+from App.models import Schedule, Staff, Shift, ShiftTemplate
 from App.database import db
+from App.offload import offload_enabled, run
+from App.profiling import profile_generation
+from App.controllers.coverage import week_coverage
+
+# Plain stand-ins for the ORM objects so a strategy can run in another process.
+StaffRef = namedtuple("StaffRef", ["id", "username"])
+ShiftRef = namedtuple("ShiftRef", ["id", "start_time", "end_time"])
+
+
+def _distribute(strategy, staff_list, shifts, week_start):
+    assignments = strategy.distribute(staff_list, shifts, week_start)
+    return {staff_id: [shift.id for shift in assigned] for staff_id, assigned in assignments.items()}
 
 
 
@@ -14,19 +28,24 @@ class ScheduleGenerator:
     def setStaffList(self, staffList):
         self.staffList = staffList
 
+    @profile_generation
     def generateSchedule(self, week_start=None):
         if self.strategy is None:
             raise ValueError("No scheduling strategy set")
         
         if not self.staffList:
             raise ValueError("Staff list is empty")
+
+        if week_start is not None:
+            # materialize recurring shifts the first time a week is asked for
+            ShiftTemplate.expand_if_empty(week_start)
     
         unassigned_shifts = Shift.query.filter_by(staff_id = None).all()
 
         if not unassigned_shifts:
             raise ValueError("No unassigned shifts available for scheduling")
         
-        assignments = self.strategy.distribute(self.staffList, unassigned_shifts, week_start)
+        assignments = self.distribute(unassigned_shifts, week_start)
 
         new_schedule = Schedule(weekStart=week_start)
 
@@ -40,5 +59,21 @@ class ScheduleGenerator:
                 
         db.session.commit()
 
+        # how well the generated week is staffed, for the caller to report
+        new_schedule.coverage = week_coverage(week_start) if week_start is not None else None
         return new_schedule
-    
+
+    def distribute(self, shifts, week_start=None):
+        if not offload_enabled():
+            return self.strategy.distribute(self.staffList, shifts, week_start)
+
+        staff_refs = [StaffRef(staff.id, staff.username) for staff in self.staffList]
+        shift_refs = [ShiftRef(shift.id, shift.start_time, shift.end_time) for shift in shifts]
+        shifts_by_id = {shift.id: shift for shift in shifts}
+
+        assigned_ids = run(_distribute, self.strategy, staff_refs, shift_refs, week_start)
+        return {
+            staff_id: [shifts_by_id[shift_id] for shift_id in shift_ids]
+            for staff_id, shift_ids in assigned_ids.items()
+        }
+
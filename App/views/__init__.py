@@ -6,7 +6,8 @@ from .auth import auth_views
 from .admin import setup_admin
 from .staffView import staff_views
 from .adminView import admin_view
+from .exportView import export_views
 
 
-views = [user_views, index_views, auth_views, staff_views,admin_view] 
+views = [user_views, index_views, auth_views, staff_views,admin_view, export_views] 
 # blueprints must be added to this list
\ No newline at end of file
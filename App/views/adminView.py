@@ -1,12 +1,22 @@
 # app/views/staff_views.py
+import io, codecs
 from flask import Blueprint, jsonify, request
 from datetime import datetime
 from App.controllers import staff, auth, admin
 from App.controllers.user import get_user
 from App.controllers.scheduler import auto_generate_schedule
 from App.controllers.admin import create_unassigned_shift
+from App.controllers.template import create_shift_template, get_shift_templates, expand_shift_templates
+from App.controllers.payroll import compute_payroll
+from App.controllers.attendance import get_attendance_summary
+from App.controllers.coverage import get_coverage
+from App.controllers.demand import generate_shifts_from_demand, parse_demand_file
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy.exc import SQLAlchemyError
+from App.cache import conditional
+from App.idempotency import idempotent
+from App.replicas import read_only
+from App.json_provider import payload_response
 
 admin_view = Blueprint('admin_view', __name__, template_folder='../templates')
 
@@ -43,6 +53,7 @@ def createSchedule():
 
 @admin_view.route('/createShift', methods=['POST'])
 @jwt_required()
+@idempotent
 def createShift():
     try:
         admin_id = get_jwt_identity()
@@ -101,15 +112,194 @@ def createUnassignedShift():
     except SQLAlchemyError:
         return jsonify({"error": "Database error"}), 500
 
+@admin_view.route('/importShifts', methods=['POST'])
+@jwt_required()
+def importShifts():
+    try:
+        admin_id = get_jwt_identity()
+        upload = request.files.get("file")
+        # accepts a multipart "file" field or the raw request body
+        stream = upload.stream if upload else request.stream
+        filename = upload.filename if upload else ""
+        file_format = request.args.get("format")
+        if not file_format:
+            is_ndjson = filename.endswith((".ndjson", ".jsonl")) or "ndjson" in (request.mimetype or "")
+            file_format = "ndjson" if is_ndjson else "csv"
+
+        # decoded line by line: under gunicorn the raw body is its own input
+        # object, which io.TextIOWrapper cannot wrap
+        lines = codecs.iterdecode(stream, "utf-8")
+        result = admin.import_shifts(admin_id, lines, file_format)
+        if result["errors"]:
+            return jsonify(result), 400
+        return jsonify(result), 200
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({"error": str(e)}), 400
+    except SQLAlchemyError:
+        return jsonify({"error": "Database error"}), 500
+
+@admin_view.route('/generateShifts', methods=['POST'])
+@jwt_required()
+def generateShifts():
+    try:
+        admin_id = get_jwt_identity()
+        upload = request.files.get("file")
+        if upload:
+            # a CSV demand curve with hour,staff columns; options come as form fields
+            demand = parse_demand_file(io.TextIOWrapper(upload.stream, encoding="utf-8", newline=""))
+            options = request.form
+            lengths = options.get("lengths")
+            lengths = lengths.split(",") if lengths else None
+        else:
+            options = request.get_json(silent=True) or {}
+            if not isinstance(options, dict):
+                return jsonify({"error": "Request body must be a JSON object"}), 400
+            demand = options.get("demand")
+            lengths = options.get("lengths")
+        result = generate_shifts_from_demand(admin_id, options.get("week_start"), demand, lengths, options.get("strategy"))
+        return jsonify(result), 201
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({"error": str(e)}), 400
+    except SQLAlchemyError:
+        return jsonify({"error": "Database error"}), 500
+
+@admin_view.route('/shiftTemplates', methods=['POST'])
+@jwt_required()
+def createShiftTemplate():
+    try:
+        admin_id = get_jwt_identity()
+        data = request.get_json()
+        template = create_shift_template(
+            admin_id,
+            data.get("weekday"), # 0 = Monday ... 6 = Sunday
+            data.get("start_time"), # "HH:MM"
+            data.get("end_time"),
+            data.get("count", 1),
+            data.get("name")
+        )
+        return jsonify(template.get_json()), 201
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except SQLAlchemyError:
+        return jsonify({"error": "Database error"}), 500
+
+@admin_view.route('/shiftTemplates', methods=['GET'])
+@jwt_required()
+def listShiftTemplates():
+    try:
+        admin_id = get_jwt_identity()
+        return jsonify([template.get_json() for template in get_shift_templates(admin_id)]), 200
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
+    except SQLAlchemyError:
+        return jsonify({"error": "Database error"}), 500
+
+@admin_view.route('/shiftTemplates/expand', methods=['POST'])
+@jwt_required()
+def expandShiftTemplates():
+    try:
+        admin_id = get_jwt_identity()
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or not isinstance(data.get("week_start"), str):
+            return jsonify({"error": "week_start (YYYY-MM-DD) is required"}), 400
+        week_start = datetime.strptime(data["week_start"], "%Y-%m-%d").date()
+        created = expand_shift_templates(admin_id, week_start, data.get("weeks", 1))
+        return jsonify({"created": created}), 200
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    except SQLAlchemyError:
+        return jsonify({"error": "Database error"}), 500
+
+@admin_view.route('/schedule/<int:schedule_id>', methods=['GET'])
+@jwt_required()
+@conditional(lambda schedule_id: f"schedule:{schedule_id}", roles=("admin",))
+def viewSchedule(schedule_id):
+    try:
+        schedule = admin.get_schedule(get_jwt_identity(), schedule_id)
+        return jsonify(schedule.get_json()), 200
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    except SQLAlchemyError:
+        return jsonify({"error": "Database error"}), 500
+
 @admin_view.route('/shiftReport', methods=['GET'])
 @jwt_required()
+@read_only
+@conditional(lambda: "shifts", roles=("admin",))
 def shiftReport():
     try:
         admin_id = get_jwt_identity()
-        report = admin.get_shift_report(admin_id)  # Call controller method
+        report = admin.get_shift_report(admin_id, request.args.get("format", "rows"))  # Call controller method
+        return payload_response(report), 200
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except SQLAlchemyError:
+        return jsonify({"error": "Database error"}), 500
+
+@admin_view.route('/payroll', methods=['GET'])
+@jwt_required()
+@read_only
+def payroll():
+    try:
+        admin_id = get_jwt_identity()
+        report = compute_payroll(
+            admin_id,
+            request.args.get("start"),
+            request.args.get("end"),
+            request.args.get("overtime_hours", type=float),
+            request.args.get("grace_minutes", type=float)
+        )
         return jsonify(report), 200
-    except (PermissionError, ValueError) as e:
+    except PermissionError as e:
         return jsonify({"error": str(e)}), 403
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except SQLAlchemyError:
+        return jsonify({"error": "Database error"}), 500
+
+@admin_view.route('/attendance', methods=['GET'])
+@jwt_required()
+@read_only
+def attendance():
+    try:
+        admin_id = get_jwt_identity()
+        return jsonify(get_attendance_summary(admin_id, request.args.get("week"))), 200
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except SQLAlchemyError:
+        return jsonify({"error": "Database error"}), 500
+
+@admin_view.route('/coverage', methods=['GET'])
+@jwt_required()
+@read_only
+def coverage():
+    try:
+        admin_id = get_jwt_identity()
+        report = get_coverage(
+            admin_id,
+            request.args.get("start"),
+            request.args.get("end"),
+            request.args.get("min_staff", type=int)
+        )
+        return jsonify(report), 200
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except SQLAlchemyError:
         return jsonify({"error": "Database error"}), 500
     
@@ -139,7 +329,9 @@ def _generate_schedule_handler(schedule_type):
         if not schedule:
             return jsonify({"error": "Failed to generate schedule"}), 500
         
-        return jsonify(schedule.get_json()), 200
+        result = schedule.get_json()
+        result["coverage"] = schedule.coverage
+        return jsonify(result), 200
         
     except ValueError as e:
         return jsonify({"error": f"Invalid input: {str(e)}"}), 400
@@ -0,0 +1,60 @@
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity, current_user
+from App.controllers import export
+from App.cache import conditional
+from App.replicas import read_only
+
+export_views = Blueprint('export_views', __name__, template_folder='../templates')
+
+# Roster exports are streamed straight from the database cursor, so memory use
+# stays flat and the first bytes go out before the query has finished.
+
+EXPORT_MIMETYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "ics": "text/calendar"
+}
+
+def _export_scope():
+    staff_id = request.args.get("staff_id")
+    return f"staff:{staff_id}" if staff_id else "shifts"
+
+def _calendar_scope():
+    return f"staff:{request.args.get('staff_id') or current_user.id}"
+
+@export_views.route('/export/roster', methods=['GET'])
+@jwt_required()
+@read_only
+@conditional(_export_scope, roles=("admin", "staff"))
+def export_roster():
+    return _export(request.args.get("format", "csv"))
+
+@export_views.route('/export/roster.ics', methods=['GET'])
+@jwt_required()
+@read_only
+@conditional(_calendar_scope, roles=("admin", "staff"))
+def export_roster_calendar():
+    return _export("ics")
+
+def _export(file_format):
+    try:
+        staff_id = export.check_export_access(get_jwt_identity(), file_format, request.args.get("staff_id"))
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    rows = export.iter_roster_rows(staff_id)
+    if file_format == "csv":
+        body = export.iter_csv(rows)
+    elif file_format == "ndjson":
+        body = export.iter_ndjson(rows)
+    else:
+        body = export.iter_ics(rows, f"Roster for staff {staff_id}")
+
+    filename = f"roster.{file_format}" if staff_id is None else f"roster-{staff_id}.{file_format}"
+    return Response(
+        stream_with_context(body),
+        mimetype=EXPORT_MIMETYPES[file_format],
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
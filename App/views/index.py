@@ -1,5 +1,7 @@
-from flask import Blueprint, redirect, render_template, request, send_from_directory, jsonify
+from flask import Blueprint, Response, abort, redirect, render_template, request, send_from_directory, jsonify
 from App.controllers import create_user, initialize
+from App.database import db, pool_stats
+from App.metrics import client_allowed, get_metrics, CONTENT_TYPE
 
 index_views = Blueprint('index_views', __name__, template_folder='../templates')
 
@@ -14,4 +16,21 @@ def init():
 
 @index_views.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({'status':'healthy'})
\ No newline at end of file
+    return jsonify({'status':'healthy'})
+
+@index_views.route('/health/pool', methods=['GET'])
+def pool_health():
+    if not client_allowed():
+        abort(404)
+    pool = db.engine.pool
+    status = {'pool': type(pool).__name__, 'checkout_wait': pool_stats.snapshot()}
+    if hasattr(pool, 'checkedout'):
+        status.update(size=pool.size(), checked_out=pool.checkedout(), overflow=pool.overflow())
+    return jsonify(status)
+
+@index_views.route('/metrics', methods=['GET'])
+def metrics():
+    collected = get_metrics()
+    if collected is None or not client_allowed():
+        abort(404)
+    return Response(collected.render(), content_type=CONTENT_TYPE)
@@ -1,8 +1,14 @@
 # app/views/staff_views.py
-from flask import Blueprint, jsonify, request
+import queue
+from flask import Blueprint, Response, jsonify, request
 from App.controllers import staff, auth
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity, current_user
 from sqlalchemy.exc import SQLAlchemyError
+from App.cache import conditional
+from App.events import get_events, format_sse, GLOBAL_CHANNEL
+from App.idempotency import idempotent
+from App.replicas import read_only
+from App.json_provider import payload_response
 
 staff_views = Blueprint('staff_views', __name__, template_folder='../templates')
 
@@ -17,17 +23,71 @@ staff_views = Blueprint('staff_views', __name__, template_folder='../templates')
 # Staff view roster route
 @staff_views.route('/staff/roster', methods=['GET'])
 @jwt_required()
+@read_only
+@conditional(lambda: "shifts", roles=("staff",))
 def view_roster():
     try:
         staff_id = get_jwt_identity()  # get the user id stored in JWT
         # staffData = staff.get_user(staff_id).get_json()  # Fetch staff data
-        roster = staff.get_combined_roster(staff_id)  # staff.get_combined_roster should return the json data of the roseter
-        return jsonify(roster), 200
+        roster = staff.get_combined_roster(staff_id, request.args.get("format", "rows"))  # staff.get_combined_roster should return the json data of the roseter
+        return payload_response(roster), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except SQLAlchemyError:
         return jsonify({"error": "Database error"}), 500
 
+# Roster change stream (server-sent events), replaces polling /staff/roster
+@staff_views.route('/staff/roster/stream', methods=['GET'])
+@jwt_required()
+def stream_roster():
+    if current_user.role not in ("staff", "admin"):
+        return jsonify({"error": "Only staff and admins can subscribe to roster changes"}), 403
+    scope = request.args.get("scope", "all")
+    if scope == "mine":
+        channels = [f"staff:{current_user.id}"]
+    elif scope == "all":
+        channels = [GLOBAL_CHANNEL]
+    else:
+        return jsonify({"error": "scope must be 'mine' or 'all'"}), 400
+
+    events = get_events()
+    last_event_id = request.headers.get("Last-Event-ID", type=int)
+    # subscribed before the replay is read, so nothing falls in between
+    subscription = events.subscribe(channels)
+    try:
+        missed = events.missed(last_event_id, channels)
+    except Exception:
+        events.unsubscribe(subscription, channels)
+        raise
+    last_seen = missed[-1][0] if missed else last_event_id
+
+    # the generator does not touch the database, so no request or app
+    # context is kept alive for the lifetime of the stream
+    def generate():
+        try:
+            yield "retry: 5000\n\n"
+            for message in missed:
+                yield format_sse(*message)
+            while True:
+                try:
+                    message = subscription.get(timeout=events.heartbeat)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if last_seen is not None and message[0] <= last_seen:
+                    continue
+                yield format_sse(*message)
+        finally:
+            events.unsubscribe(subscription, channels)
+
+    return Response(generate(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
 @staff_views.route('/staff/shift', methods=['GET'])
 @jwt_required()
+@read_only
 def view_shift():
     try:
         data = request.get_json()
@@ -42,6 +102,7 @@ def view_shift():
 # Staff Clock in endpoint
 @staff_views.route('/staff/clock_in', methods=['POST'])
 @jwt_required()
+@idempotent
 def clockIn():
     try:
         staff_id = int(get_jwt_identity())# db uses int for userID so we must convert
@@ -58,6 +119,7 @@ def clockIn():
 # Staff Clock in endpoint
 @staff_views.route('/staff/clock_out/', methods=['POST'])
 @jwt_required()
+@idempotent
 def clock_out():
     try:
         staff_id = int(get_jwt_identity()) # db uses int for userID so we must convert
@@ -68,4 +130,23 @@ def clock_out():
     except (PermissionError, ValueError) as e:
         return jsonify({"error": str(e)}), 403
     except SQLAlchemyError:
-        return jsonify({"error": "Database error"}), 500
\ No newline at end of file
+        return jsonify({"error": "Database error"}), 500
+
+# Batched punches from time-clock terminals
+@staff_views.route('/staff/clock_events', methods=['POST'])
+@jwt_required()
+@idempotent
+def clock_events():
+    try:
+        data = request.get_json(silent=True)
+        events = data.get("events") if isinstance(data, dict) else data
+        if not isinstance(events, list):
+            return jsonify({"error": "Request body must contain a list of events"}), 400
+        results = staff.apply_clock_events(get_jwt_identity(), events)
+        summary = {status: sum(1 for result in results if result["status"] == status)
+                   for status in ("applied", "duplicate", "conflict", "error")}
+        return jsonify({"results": results, **summary}), 200
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
+    except SQLAlchemyError:
+        return jsonify({"error": "Database error"}), 500
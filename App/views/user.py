@@ -1,14 +1,16 @@
-from flask import Blueprint, render_template, jsonify, request, send_from_directory, flash, redirect, url_for
+from flask import Blueprint, current_app, render_template, jsonify, request, send_from_directory, flash, redirect, url_for
 from flask_jwt_extended import jwt_required, current_user as jwt_current_user
 
 from.index import index_views
+from App.replicas import read_only
 
 from App.controllers import (
     create_user,
     get_all_users,
     get_all_users_json,
-    jwt_required
+    bulk_create_users
 )
+from App.controllers.user import VALID_ROLES
 
 user_views = Blueprint('user_views', __name__, template_folder='../templates')
 
@@ -25,6 +27,7 @@ def create_user_action():
     return redirect(url_for('user_views.get_user_page'))
 
 @user_views.route('/api/users', methods=['GET'])
+@read_only
 def get_users_action():
     users = get_all_users_json()
     return jsonify(users)
@@ -35,6 +38,21 @@ def create_user_endpoint():
     user = create_user(data['username'], data['password'], data['role']) 
     return jsonify({'message': f"user {user.username} created with id {user.id}"}), 201
 
+@user_views.route('/api/users/bulk', methods=['POST'])
+@jwt_required()
+def bulk_create_users_endpoint():
+    if jwt_current_user is None or jwt_current_user.role != 'admin':
+        return jsonify({'error': 'Only admins can create users in bulk'}), 403
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('users')
+    if not isinstance(data, list):
+        return jsonify({'error': 'Request body must be a list of users'}), 400
+    # admin accounts come from the CLI unless BULK_USERS_ALLOW_ADMIN is set
+    roles = VALID_ROLES if current_app.config.get('BULK_USERS_ALLOW_ADMIN') else VALID_ROLES - {'admin'}
+    result = bulk_create_users(data, roles=roles)
+    return jsonify(result), 201 if result['created'] else 400
+
 @user_views.route('/static/users', methods=['GET'])
 def static_user_page():
   return send_from_directory('static', 'static-user.html')
\ No newline at end of file
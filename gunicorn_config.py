@@ -1,4 +1,5 @@
 # gunicorn_config.py
+import glob
 import os
 bind = "0.0.0.0:" + os.environ.get('PORT', '10000')
 
@@ -14,3 +15,14 @@ loglevel = 'info'
 # Where to log to
 accesslog = '-'  # '-' means log to stdout
 errorlog = '-'  # '-' means log to stderr
+
+# Workers write their request metrics to per-process files in this directory
+# (see App/metrics.py) and /metrics adds them up; start every run empty so
+# files of workers from an earlier run are not counted. The app reads it as
+# METRICS_DIR; outside gunicorn it keeps its metrics in process.
+metrics_dir = os.environ.get('FLASK_METRICS_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'metrics')
+os.environ['FLASK_METRICS_DIR'] = metrics_dir
+
+def on_starting(server):
+    for path in glob.glob(os.path.join(metrics_dir, '*.json')):
+        os.remove(path)
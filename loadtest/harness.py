@@ -0,0 +1,435 @@
+"""Load test for the roster API.
+
+Replays weighted scenarios built from the requests in
+RosterAPI.postman_collection.json against a gunicorn started for the run,
+on a fresh SQLite database filled by `flask seed`, and
+prints throughput and p50/p95/p99 latency per endpoint as JSON.
+
+    python loadtest/harness.py --users 20 --duration 60 --output report.json
+
+Scenario weights are set with --mix, e.g. --mix roster_polling=6,clock_burst=3.
+--url runs against a server that is already up instead (seeded by an earlier
+run with --keep, so the load_staff_N accounts exist). Only the standard
+library is used, so the harness runs from the app's own environment.
+"""
+import argparse, base64, http.client, json, math, os, random, shutil
+import subprocess, sys, tempfile, threading, time, uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COLLECTION = os.path.join(ROOT, "RosterAPI.postman_collection.json")
+
+ADMIN = ("bob", "bobpass")  # created by `flask init`, as in the collection
+STAFF_PREFIX = "load_staff_"
+STAFF_PASSWORD = "loadpass"
+STRATEGIES = ("even", "balanceDayNight", "minimizeDays")
+
+DEFAULT_MIX = {"login": 1, "roster_polling": 6, "clock_burst": 3, "report": 1, "generation": 0.2}
+
+
+def load_collection(path=COLLECTION):
+    """Maps "METHOD /path" to the method, path, JSON body and bearer flag of each collection request."""
+    with open(path, encoding="utf-8") as file:
+        collection = json.load(file)
+    requests = {}
+
+    def walk(items):
+        for item in items:
+            if "item" in item:
+                walk(item["item"])
+                continue
+            request = item["request"]
+            url = request["url"]["raw"] if isinstance(request["url"], dict) else request["url"]
+            path = url.replace("{{host}}", "") or "/"
+            raw = (request.get("body") or {}).get("raw", "").strip()
+            requests.setdefault(f"{request['method']} {path}", {
+                "method": request["method"],
+                "path": path,
+                "body": json.loads(raw) if raw else None,
+                "auth": (request.get("auth") or {}).get("type") == "bearer"
+            })
+
+    walk(collection["item"])
+    return requests
+
+
+class Client:
+    """One keep-alive connection, with the token of the account it logged in as."""
+
+    def __init__(self, base_url, collection, samples, timeout=30):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.collection = collection
+        self.samples = samples
+        self.timeout = timeout
+        self.connection = None
+        self.credentials = None
+        self.token = None
+        self.user_id = None
+        self.recording = False
+
+    def _send(self, method, path, body, headers):
+        for attempt in (1, 2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.connection.request(method, path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                return response, response.read()
+            except (http.client.HTTPException, ConnectionError):
+                # the server closed the kept-alive connection; reconnect once
+                self.connection.close()
+                self.connection = None
+                if attempt == 2:
+                    raise
+
+    def request(self, method, path, body=None, headers=None, auth=True):
+        """Sends one request, with this client's token if auth; status 0 means the connection failed."""
+        headers = dict(headers or {})
+        if auth and self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        try:
+            response, content = self._send(method, path, body, headers)
+            return response.status, response, content
+        except (OSError, http.client.HTTPException):
+            return 0, None, b""
+
+    def call(self, key, body=None, headers=None, query="", label=None, relogin=True):
+        """Sends the collection request key, with its JSON body updated from body."""
+        spec = self.collection[key]
+        payload = dict(spec["body"] or {})
+        payload.update(body or {})
+        headers = dict(headers or {})
+        data = None
+        if payload:
+            data = json.dumps(payload).encode()
+            headers["Content-Type"] = "application/json"
+
+        started = time.perf_counter()
+        status, response, content = self.request(spec["method"], spec["path"] + query, data, headers, spec["auth"])
+        if status in (307, 308):
+            # e.g. /staff/clock_out is served at /staff/clock_out/; follow it like Postman does
+            location = urlsplit(response.getheader("Location"))
+            path = location.path + (f"?{location.query}" if location.query else "")
+            status, response, content = self.request(spec["method"], path, data, headers, spec["auth"])
+        elapsed = time.perf_counter() - started
+        if self.recording:
+            self.samples[label or key].append((status, elapsed))
+
+        if status == 401 and relogin and self.credentials:
+            # the token expired during a long run
+            self.login(*self.credentials)
+            return self.call(key, body, headers, query, label, relogin=False)
+        return status, response, content
+
+    def login(self, username, password):
+        status, _, content = self.call("POST /api/login", {"username": username, "password": password}, relogin=False)
+        if status != 200:
+            raise RuntimeError(f"Login as {username} failed with {status}")
+        self.credentials = (username, password)
+        self.token = json.loads(content)["access_token"]
+        claims = self.token.split(".")[1]
+        self.user_id = int(json.loads(base64.urlsafe_b64decode(claims + "=" * (-len(claims) % 4)))["sub"])
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, number, options, collection, scenarios, weights, deadline, record_after):
+        super().__init__(name=f"vu-{number}", daemon=True)
+        self.options = options
+        self.samples = defaultdict(list)
+        self.runs = Counter()
+        self.errors = []
+        self.staff = Client(options.url, collection, self.samples)
+        self.admin = Client(options.url, collection, self.samples)
+        self.staff_account = f"{STAFF_PREFIX}{number % options.staff + 1}"
+        self.scenarios = scenarios
+        self.weights = weights
+        self.deadline = deadline
+        self.record_after = record_after
+        self.roster_etag = None
+        self.own_shifts = None
+        self.random = random.Random(number)
+
+    def think(self):
+        if self.options.think_ms:
+            time.sleep(self.random.uniform(0.5, 1.5) * self.options.think_ms / 1000)
+
+    def run(self):
+        names = list(self.scenarios)
+        weights = [self.weights[name] for name in names]
+        while time.monotonic() < self.deadline:
+            recording = time.monotonic() >= self.record_after
+            self.staff.recording = self.admin.recording = recording
+            name = self.random.choices(names, weights)[0]
+            try:
+                self.scenarios[name](self)
+                if recording:
+                    self.runs[name] += 1
+            except Exception as error:
+                self.errors.append(f"{name}: {error}")
+            self.think()
+        self.staff.close()
+        self.admin.close()
+
+    def as_staff(self):
+        if self.staff.token is None:
+            self.staff.login(self.staff_account, STAFF_PASSWORD)
+        return self.staff
+
+    def as_admin(self):
+        if self.admin.token is None:
+            self.admin.login(*ADMIN)
+        return self.admin
+
+
+# Scenarios: each is one user action, made of requests from the collection.
+
+def scenario_login(user):
+    client = Client(user.options.url, user.staff.collection, user.samples)
+    client.recording = user.staff.recording
+    client.login(user.staff_account, STAFF_PASSWORD)
+    client.call("GET /api/logout")
+    client.close()
+
+
+def scenario_roster_polling(user):
+    # a client polling with If-None-Match, as the web roster does
+    client = user.as_staff()
+    for _ in range(user.options.polls):
+        headers = {"If-None-Match": user.roster_etag} if user.roster_etag else {}
+        status, response, content = client.call("GET /staff/roster", headers=headers)
+        if status == 200:
+            user.roster_etag = response.getheader("ETag")
+            if user.own_shifts is None:
+                user.own_shifts = [shift["id"] for shift in json.loads(content) if shift["staff_id"] == client.user_id]
+        user.think()
+
+
+def scenario_clock_burst(user):
+    client = user.as_staff()
+    if user.own_shifts is None:
+        status, _, content = client.call("GET /staff/roster")
+        user.own_shifts = [shift["id"] for shift in json.loads(content) if shift["staff_id"] == client.user_id] if status == 200 else []
+    if not user.own_shifts:
+        return
+    shift_id = user.random.choice(user.own_shifts)
+    client.call("GET /staff/shift", {"shiftID": shift_id})
+    for key in ("POST /staff/clock_in", "POST /staff/clock_out"):
+        client.call(key, {"shiftID": shift_id}, headers={"Idempotency-Key": str(uuid.uuid4())})
+
+
+def scenario_report(user):
+    user.as_admin().call("GET /shiftReport")
+
+
+def scenario_generation(user):
+    client = user.as_admin()
+    start = datetime.combine(week_start(), datetime.min.time()) + timedelta(hours=user.random.randrange(7 * 24 - 8))
+    for _ in range(user.options.generation_shifts):
+        client.call("POST /createUnassignedShift", {
+            "start_time": start.isoformat(),
+            "end_time": (start + timedelta(hours=8)).isoformat()
+        })
+    strategy = user.random.choice(STRATEGIES)
+    client.call(f"POST /autoGenerateSchedule/{strategy}", {"week_start": week_start().isoformat()})
+
+
+SCENARIOS = {
+    "login": scenario_login,
+    "roster_polling": scenario_roster_polling,
+    "clock_burst": scenario_clock_burst,
+    "report": scenario_report,
+    "generation": scenario_generation
+}
+
+REQUIRED = ["POST /api/login", "GET /api/logout", "GET /staff/roster", "GET /staff/shift", "POST /staff/clock_in",
+            "POST /staff/clock_out", "GET /shiftReport", "POST /createUnassignedShift"] + \
+           [f"POST /autoGenerateSchedule/{strategy}" for strategy in STRATEGIES]
+
+
+def week_start():
+    today = datetime.now().date()
+    return today - timedelta(days=today.weekday())
+
+
+def percentile(ordered, p):
+    # nearest rank
+    return ordered[max(math.ceil(p / 100 * len(ordered)) - 1, 0)]
+
+
+def build_report(users, options, elapsed):
+    samples = defaultdict(list)
+    runs = Counter()
+    errors = []
+    for user in users:
+        for key, values in user.samples.items():
+            samples[key].extend(values)
+        runs.update(user.runs)
+        errors.extend(user.errors)
+
+    endpoints = {}
+    for key in sorted(samples):
+        values = samples[key]
+        latencies = sorted(seconds * 1000 for _, seconds in values)
+        statuses = Counter(status for status, _ in values)
+        endpoints[key] = {
+            "requests": len(values),
+            "throughput_rps": round(len(values) / elapsed, 2),
+            "errors": sum(count for status, count in statuses.items() if status == 0 or status >= 500),
+            "status": {str(status): count for status, count in sorted(statuses.items())},
+            "mean_ms": round(sum(latencies) / len(latencies), 2),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "max_ms": round(latencies[-1], 2)
+        }
+    total = sum(endpoint["requests"] for endpoint in endpoints.values())
+    return {
+        "target": options.url,
+        "users": options.users,
+        "duration_s": round(elapsed, 2),
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 2),
+        "scenarios": dict(sorted(runs.items())),
+        "endpoints": endpoints,
+        "client_errors": Counter(errors).most_common(10)
+    }
+
+
+def server_env(workdir):
+    # every file the app keeps in instance/ goes to the run's own directory
+    env = dict(os.environ)
+    env.update({
+        "FLASK_APP": "wsgi",
+        "FLASK_SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(workdir, 'load.db')}",
+        "FLASK_CACHE_BACKEND_PATH": os.path.join(workdir, "cache.sqlite3"),
+        "FLASK_EVENTS_BROKER_PATH": os.path.join(workdir, "events.sqlite3"),
+        "FLASK_IDEMPOTENCY_BACKEND_PATH": os.path.join(workdir, "idempotency.sqlite3"),
+        "FLASK_METRICS_DIR": os.path.join(workdir, "metrics"),
+        "FLASK_PROFILE_DIR": os.path.join(workdir, "profiles")
+    })
+    return env
+
+
+def seed(options, env):
+    # `flask seed` numbers the accounts load_staff_1 .. load_staff_N
+    commands = [
+        ["init"],
+        ["seed", "--staff", str(options.staff), "--weeks", str(options.weeks), "--shifts-per-day", str(options.shifts_per_day),
+         "--clock-rate", str(options.clock_rate), "--prefix", STAFF_PREFIX, "--password", STAFF_PASSWORD]
+    ]
+    for command in commands:
+        result = subprocess.run([sys.executable, "-m", "flask", *command], cwd=ROOT, env=env, check=True,
+                                stdout=subprocess.PIPE, text=True)
+        print(result.stdout.strip(), file=sys.stderr)
+
+
+def start_server(options, env, workdir):
+    log = open(os.path.join(workdir, "gunicorn.log"), "w")
+    command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn_config.py", "--bind", f"127.0.0.1:{options.port}",
+               "--workers", str(options.workers), "wsgi:app"]
+    if options.worker_class:
+        command[5:5] = ["--worker-class", options.worker_class]
+    if options.threads:
+        command[5:5] = ["--threads", str(options.threads)]
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with {server.returncode}, see {log.name}")
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", options.port, timeout=1)
+            connection.request("GET", "/health")
+            if connection.getresponse().status == 200:
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"gunicorn did not answer /health within 30s, see {log.name}")
+
+
+def parse_mix(text):
+    mix = dict(DEFAULT_MIX)
+    for part in filter(None, (text or "").split(",")):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        mix[name] = float(weight)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def run(options):
+    collection = load_collection()
+    missing = [key for key in REQUIRED if key not in collection]
+    if missing:
+        raise SystemExit(f"The collection has no {', '.join(missing)}")
+    weights = parse_mix(options.mix)
+
+    server = None
+    workdir = tempfile.mkdtemp(prefix="roster-load-")
+    try:
+        if not options.url:
+            options.url = f"http://127.0.0.1:{options.port}"
+            env = server_env(workdir)
+            seed(options, env)
+            server = start_server(options, env, workdir)
+
+        started = time.monotonic()
+        record_after = started + options.warmup
+        deadline = record_after + options.duration
+        users = [VirtualUser(number, options, collection, {name: SCENARIOS[name] for name in weights}, weights, deadline, record_after)
+                 for number in range(options.users)]
+        for user in users:
+            user.start()
+        for user in users:
+            user.join()
+        return build_report(users, options, time.monotonic() - record_after)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+        if options.keep:
+            print(f"Kept the database and logs in {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the roster API with scenarios from the Postman collection")
+    parser.add_argument("--url", help="Test a running server instead of starting one")
+    parser.add_argument("--port", type=int, default=18080, help="Port for the started gunicorn")
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn workers")
+    parser.add_argument("--worker-class", help="gunicorn worker class (default: gunicorn_config.py)")
+    parser.add_argument("--threads", type=int, help="gunicorn threads per worker, for --worker-class gthread")
+    parser.add_argument("--staff", type=int, default=50, help="Staff accounts to seed and log in as")
+    parser.add_argument("--weeks", type=int, default=1, help="Seeded weeks of shifts, ending with this one")
+    parser.add_argument("--shifts-per-day", type=int, default=1, help="Seeded shifts per staff member and day")
+    parser.add_argument("--clock-rate", type=float, default=0.9, help="Share of seeded past shifts already clocked")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds measured, after the warmup")
+    parser.add_argument("--warmup", type=float, default=3, help="Seconds run before measuring")
+    parser.add_argument("--think-ms", type=float, default=100, help="Mean pause between a user's actions")
+    parser.add_argument("--polls", type=int, default=3, help="Roster requests per polling scenario")
+    parser.add_argument("--generation-shifts", type=int, default=3, help="Shifts added before each generation")
+    parser.add_argument("--mix", help="Scenario weights, e.g. roster_polling=6,clock_burst=3,generation=0")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--keep", action="store_true", help="Keep the database and server log")
+    options = parser.parse_args(argv)
+
+    report = run(options)
+    text = json.dumps(report, indent=2)
+    if options.output:
+        with open(options.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,7 @@ from App.database import db, get_migrate
 from App.models import User
 from App.main import create_app 
 from App.controllers import (
-    create_user, get_all_users_json, get_all_users, initialize,
+    create_user, get_all_users_json, get_all_users, initialize, bulk_create_users, parse_user_file,
     schedule_shift, get_combined_roster, clock_in, clock_out, get_shift_report, login,loginCLI
 )
 
@@ -56,6 +56,15 @@ def create_user_command(username, password, role):
     create_user(username, password, role)
     print(f'{username} created!')
 
+@user_cli.command("import", help="Creates users in bulk from a CSV or JSON file")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--chunk-size", default=500, help="Users inserted per transaction")
+def import_users_command(path, chunk_size):
+    result = bulk_create_users(parse_user_file(path), chunk_size=chunk_size)
+    print(f'✅ {result["created"]} users created')
+    for error in result["errors"]:
+        print(f'⚠️ Row {error["row"]}: {error["error"]}')
+
 @user_cli.command("list", help="Lists users in the database")
 @click.argument("format", default="string")
 def list_user_command(format):
@@ -86,6 +95,24 @@ def schedule_shift_command(staff_id, schedule_id, start, end):
 
 
 
+@shift_cli.command("import", help="Admin imports shifts from a CSV or NDJSON file")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "file_format", type=click.Choice(["csv", "ndjson"]), default=None)
+def import_shifts_command(path, file_format):
+    from App.controllers.admin import import_shifts
+    admin = require_admin_login()
+    if file_format is None:
+        file_format = "ndjson" if path.endswith((".ndjson", ".jsonl")) else "csv"
+    with open(path, newline="", encoding="utf-8") as lines:
+        result = import_shifts(admin.id, lines, file_format)
+    if result["errors"]:
+        print(f"❌ Import rejected, {len(result['errors'])} bad line(s):")
+        for error in result["errors"]:
+            print(f"  line {error['line']}: {error['error']}")
+    else:
+        print(f"✅ Imported {result['imported']} shifts")
+
+
 @shift_cli.command("roster", help="Staff views combined roster")
 def roster_command():
     staff = require_staff_login()
@@ -253,11 +280,80 @@ def auto_schedule_command(schedule_id, strategy, staff_ids):
     print(f"Strategy: {strategy}")
     print(f"Staff count: {len(staff_members)}")
     print(f"Shifts assigned: {len(new_schedule.shifts)}")
+    if new_schedule.coverage is not None:
+        coverage = new_schedule.coverage
+        print(f"Coverage: peak {coverage['peak_staff']} staff, {len(coverage['gaps'])} gap(s), "
+              f"{coverage['under_covered_hours']}h below {coverage['min_staff']} staff")
 
 
 
 
 app.cli.add_command(schedule_cli)
+
+
+attendance_cli = AppGroup('attendance', help='Attendance summary commands')
+
+@attendance_cli.command("rebuild", help="Recomputes the weekly attendance summaries from all shifts")
+def rebuild_attendance_command():
+    from App.controllers import rebuild_attendance
+    rows = rebuild_attendance()
+    print(f"✅ Rebuilt {rows} attendance summary row(s)")
+
+app.cli.add_command(attendance_cli)
+
+
+@app.cli.command("seed", help="Adds synthetic staff, shifts and clock events for capacity testing")
+@click.option("--staff", default=100, show_default=True, help="Staff accounts to create")
+@click.option("--weeks", default=4, show_default=True, help="Weeks of shifts, ending with the current one")
+@click.option("--shifts-per-day", default=1, show_default=True, help="Shifts per staff member and day")
+@click.option("--clock-rate", default=0.9, show_default=True, type=click.FloatRange(0, 1), help="Share of past shifts clocked in and out")
+@click.option("--password", default="staffpass", show_default=True, help="Password of every created account")
+@click.option("--prefix", default="staff", show_default=True, help="Usernames are the prefix and a number")
+@click.option("--batch-size", default=20000, show_default=True, help="Rows inserted per transaction")
+@click.option("--random-seed", type=int, help="Makes the clock events repeatable")
+def seed_command(staff, weeks, shifts_per_day, clock_rate, password, prefix, batch_size, random_seed):
+    from App.controllers import seed_database
+    try:
+        result = seed_database(staff, weeks, shifts_per_day, clock_rate, password, prefix, batch_size, random_seed)
+    except ValueError as e:
+        print(f"⚠️ {e}")
+        return
+    print(f"✅ Created {result['staff']} staff, {result['schedules']} schedules and {result['shifts']} shifts "
+          f"({result['clocked_shifts']} clocked) in {result['seconds']}s")
+
+
+profile_cli = AppGroup('profile', help='Profiles of slow requests and schedule generations')
+
+@profile_cli.command("list", help="Lists the kept profiles, newest first")
+@click.option("--limit", default=20, show_default=True, help="Number of profiles to show")
+def list_profiles_command(limit):
+    from App.profiling import list_profiles, profile_directory
+    profiles = list_profiles(profile_directory(app))
+    if not profiles:
+        print("No profiles recorded (set PROFILING_ENABLED to capture them)")
+        return
+    for profile in profiles[:limit]:
+        status = f" [{profile['status']}]" if "status" in profile else ""
+        print(f"{profile['id']}  {profile['kind']:<10}  {profile['name']}{status}  "
+              f"{profile['duration_ms']:.1f} ms, {profile['sql']['count']} queries ({profile['sql']['total_ms']:.1f} ms)")
+
+@profile_cli.command("show", help="Shows the slowest functions and the SQL of a profile")
+@click.argument("profile_id")
+def show_profile_command(profile_id):
+    from App.profiling import load_profile, profile_directory
+    try:
+        profile = load_profile(profile_directory(app), profile_id)
+    except ValueError as e:
+        print(f"⚠️ {e}")
+        return
+    print(f"{profile['kind']} {profile['name']} at {profile['started']}: {profile['duration_ms']:.1f} ms")
+    for row in profile["top"]:
+        print(f"{row['cumulative_ms']:>10.1f} ms {row['total_ms']:>10.1f} ms {row['calls']:>8}  {row['function']}")
+    print(f"{profile['sql']['count']} queries, {profile['sql']['total_ms']:.1f} ms")
+    for statement in profile["sql"]["statements"]:
+        print(f"{statement['ms']:>10.3f} ms  {' '.join(statement['sql'].split())}")
+
+app.cli.add_command(profile_cli)
 '''
 Test Commands
 '''